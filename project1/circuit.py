@@ -0,0 +1,455 @@
+"""
+Compilation of expressions into a flat arithmetic circuit.
+
+An expression tree is compiled once into a linear list of instructions, each
+instruction writing its result into its own slot:
+>>> circuit = compile_expression(alice_secret * bob_secret * Scalar(2))
+>>> [OP_NAMES[op] for op in circuit.ops]
+['INPUT', 'INPUT', 'MUL', 'MUL_CONST']
+
+Public subtrees (only involving scalars) are folded at compile time, so scalars
+only appear as constant operands of the instructions. Subtrees of additions,
+subtractions and multiplications by scalars are collapsed into a single weighted
+sum of their secret operands:
+>>> circuit = compile_expression(a + b + c - Scalar(2) * d + Scalar(5))
+>>> [OP_NAMES[op] for op in circuit.ops]
+['INPUT', 'INPUT', 'INPUT', 'INPUT', 'LINEAR']
+
+Folded constants and coefficients are reduced modulo the field, to their signed
+representative, so that they stay small however long the folded chains are.
+
+The instructions are ordered so that the secret multiplications of a same
+multiplicative depth are contiguous, and can be evaluated together in a single
+round.
+"""
+
+from typing import (
+    Dict,
+    List,
+    Optional,
+    Tuple,
+)
+
+import numpy as np
+
+from expression import (
+    Expression,
+    Secret,
+    Scalar,
+    AddOp, SubOp, MultOp,
+)
+from secret_sharing import DEFAULT_MODULUS, to_signed
+
+
+# Opcodes. Operands are slot indices, unless stated otherwise.
+OP_INPUT = 0        # share of the secret labels[i]
+OP_CONST = 1        # public constant arg_a
+OP_ADD = 2          # slot a + slot b
+OP_SUB = 3          # slot a - slot b
+OP_ADD_CONST = 4    # slot a + constant b
+OP_RSUB_CONST = 5   # constant a - slot b
+OP_MUL_CONST = 6    # slot a * constant b
+OP_MUL = 7          # slot a * slot b, Beaver multiplication with the triplet labels[i]
+OP_LINEAR = 8       # linear combination combinations[a]
+
+OP_NAMES = [
+    "INPUT", "CONST", "ADD", "SUB", "ADD_CONST", "RSUB_CONST", "MUL_CONST", "MUL", "LINEAR",
+]
+
+# Instructions that can be collapsed into a linear combination
+LINEAR_OPS = (OP_ADD, OP_SUB, OP_ADD_CONST, OP_RSUB_CONST, OP_MUL_CONST)
+
+
+class LinearCombination:
+    """
+    A weighted sum of slots plus a public constant: sum(coefficients[i] * slots[i]) + constant.
+    """
+
+    __slots__ = ("slots", "coefficients", "constant", "_vectors")
+
+    def __init__(self, slots: List[int], coefficients: List[int], constant: int = 0):
+        self.slots = slots
+        self.coefficients = coefficients
+        self.constant = constant
+        # Coefficients as field elements, by modulus
+        self._vectors: Dict[int, np.ndarray] = {}
+
+
+    def __repr__(self):
+        terms = " + ".join(f"{coef} * {slot}" for slot, coef in zip(self.slots, self.coefficients))
+        return f"{terms} + {self.constant}"
+
+
+    def coefficient_vector(self, modulus: int) -> np.ndarray:
+        """
+        Coefficients reduced modulo `modulus`, as a uint64 vector.
+        """
+        if modulus not in self._vectors:
+            self._vectors[modulus] = np.array([coef % modulus for coef in self.coefficients], dtype=np.uint64)
+        return self._vectors[modulus]
+
+
+class Circuit:
+    """
+    A compiled arithmetic circuit.
+
+    Attributes:
+        ops: opcode of each instruction
+        arg_a: first operand of each instruction
+        arg_b: second operand of each instruction
+        labels: ID of the secret of OP_INPUT, ID of the Beaver triplet of OP_MUL (derived from its
+            slot, so that it is unique and the same for every party), None otherwise
+        depths: multiplicative depth of each instruction
+        combinations: linear combinations of the OP_LINEAR instructions
+        output: slot holding the result of the circuit
+    """
+
+    def __init__(self):
+        self.ops: List[int] = []
+        self.arg_a: List[int] = []
+        self.arg_b: List[int] = []
+        self.labels: List[Optional[str]] = []
+        self.depths: List[int] = []
+        self.combinations: List[LinearCombination] = []
+        self.output: int = -1
+        # Slot of each distinct instruction, for common subexpression elimination
+        self._numbering: Dict[Tuple[int, int, int, Optional[str]], int] = {}
+
+
+    def __len__(self):
+        return len(self.ops)
+
+
+    def __repr__(self):
+        lines = []
+        for i in range(len(self)):
+            if self.ops[i] == OP_LINEAR:
+                lines.append(f"{i}: LINEAR {self.combinations[self.arg_a[i]]!r}")
+                continue
+            lines.append(
+                f"{i}: {OP_NAMES[self.ops[i]]} {self.arg_a[i]} {self.arg_b[i]}"
+                + (f" [{self.labels[i]}]" if self.labels[i] is not None else "")
+            )
+        return "\n".join(lines)
+
+
+    def emit(self, op: int, a: int = 0, b: int = 0, label: Optional[str] = None, depth: int = 0) -> int:
+        """
+        Append an instruction and return its slot.
+
+        If the same instruction was already emitted, its slot is returned instead, so that a
+        common subexpression is only computed once (and a multiplication only consumes one
+        Beaver triplet). Operands of commutative operations are ordered before the lookup.
+        """
+        if op in (OP_ADD, OP_MUL) and b < a:
+            a, b = b, a
+        key = (op, a, b, label if op == OP_INPUT else None)
+        if key in self._numbering:
+            return self._numbering[key]
+
+        self._numbering[key] = len(self.ops)
+        self.ops.append(op)
+        self.arg_a.append(a)
+        self.arg_b.append(b)
+        self.labels.append(label)
+        self.depths.append(depth)
+        return len(self.ops) - 1
+
+
+    def emit_linear(self, combination: LinearCombination, depth: int = 0) -> int:
+        """
+        Append a linear combination instruction and return its slot.
+        """
+        self.combinations.append(combination)
+        return self.emit(OP_LINEAR, len(self.combinations) - 1, depth=depth)
+
+
+    def operands(self, i: int) -> Tuple[int, ...]:
+        """
+        Slots read by an instruction.
+        """
+        op = self.ops[i]
+        if op == OP_LINEAR:
+            return tuple(self.combinations[self.arg_a[i]].slots)
+        if op in (OP_ADD, OP_SUB, OP_MUL):
+            return (self.arg_a[i], self.arg_b[i])
+        if op in (OP_ADD_CONST, OP_MUL_CONST):
+            return (self.arg_a[i],)
+        if op == OP_RSUB_CONST:
+            return (self.arg_b[i],)
+        return ()
+
+
+    def consumers(self) -> List[List[int]]:
+        """
+        Instructions reading each slot.
+        """
+        res: List[List[int]] = [[] for _ in range(len(self))]
+        for i in range(len(self)):
+            for slot in set(self.operands(i)):
+                res[slot].append(i)
+        return res
+
+
+    def rounds(self) -> List[Tuple[int, int]]:
+        """
+        Ranges [start, end) of the contiguous secret multiplications, one per multiplicative depth.
+        """
+        res = []
+        start = None
+        for i in range(len(self) + 1):
+            is_mul = i < len(self) and self.ops[i] == OP_MUL
+            if start is not None and (not is_mul or self.depths[i] != self.depths[start]):
+                res.append((start, i))
+                start = None
+            if is_mul and start is None:
+                start = i
+        return res
+
+
+def _reduce(value: int) -> int:
+    """
+    Signed representative of a public value in the field, so that folding keeps it small while
+    small negative values (e.g. the -1 of a subtraction) are kept as they are.
+    """
+    return to_signed(value, DEFAULT_MODULUS)
+
+
+def _fold(expr: Expression, a: int, b: int) -> int:
+    """
+    Compute the value of an operation between two public values.
+    """
+    if isinstance(expr, AddOp):
+        return _reduce(a + b)
+    elif isinstance(expr, SubOp):
+        return _reduce(a - b)
+    elif isinstance(expr, MultOp):
+        return _reduce(a * b)
+    raise TypeError(f"Unknown operation {expr!r}")
+
+
+def _schedule(circuit: Circuit) -> Circuit:
+    """
+    Reorder the instructions so that the multiplications of a same depth are contiguous.
+
+    Linear instructions of depth d are run after the multiplications of depth d, which are
+    run after the linear instructions of depth d - 1. The order is otherwise preserved, so
+    every instruction still comes after its operands.
+
+    Every multiplication is labelled by its final slot, which identifies its Beaver triplet.
+    """
+    def stage(i: int) -> int:
+        return 2 * circuit.depths[i] - (1 if circuit.ops[i] == OP_MUL else 0)
+
+    order = sorted(range(len(circuit)), key=stage)
+    new_slot = [0] * len(circuit)
+    for new, old in enumerate(order):
+        new_slot[old] = new
+
+    res = Circuit()
+    for old in order:
+        op = circuit.ops[old]
+        a, b = circuit.arg_a[old], circuit.arg_b[old]
+        if op == OP_LINEAR:
+            combination = circuit.combinations[a]
+            slots = [new_slot[slot] for slot in combination.slots]
+            res.emit_linear(LinearCombination(slots, combination.coefficients, combination.constant), circuit.depths[old])
+            continue
+        if op in (OP_ADD, OP_SUB, OP_MUL, OP_ADD_CONST, OP_MUL_CONST):
+            a = new_slot[a]
+        if op in (OP_ADD, OP_SUB, OP_MUL, OP_RSUB_CONST):
+            b = new_slot[b]
+        label = f"mul{new_slot[old]}" if op == OP_MUL else circuit.labels[old]
+        res.emit(op, a, b, label, circuit.depths[old])
+
+    res.output = new_slot[circuit.output]
+    return res
+
+
+def compile_expression(expr: Expression) -> Circuit:
+    """
+    Compile an expression into a circuit, folding its public subtrees and eliminating its
+    common subexpressions.
+
+    The expression is walked iteratively, so arbitrarily deep expressions can be compiled.
+    """
+    circuit = Circuit()
+    # Slot of each compiled secret node, and value of each folded public node, by node identity:
+    # the random IDs of the nodes are short, so they may collide in large expressions
+    slots: Dict[int, int] = {}
+    constants: Dict[int, int] = {}
+
+    stack: List[Tuple[Expression, bool]] = [(expr, False)]
+    while stack:
+        node, expanded = stack.pop()
+        if id(node) in slots or id(node) in constants:
+            continue
+
+        if isinstance(node, Secret):
+            slots[id(node)] = circuit.emit(OP_INPUT, label=node.id.decode())
+            continue
+        if isinstance(node, Scalar):
+            constants[id(node)] = _reduce(node.value)
+            continue
+        if not expanded:
+            stack.append((node, True))
+            stack.append((node.b, False))
+            stack.append((node.a, False))
+            continue
+
+        a_public, b_public = id(node.a) in constants, id(node.b) in constants
+        if a_public and b_public:
+            constants[id(node)] = _fold(node, constants[id(node.a)], constants[id(node.b)])
+            continue
+
+        if a_public or b_public:
+            value = constants[id(node.a)] if a_public else constants[id(node.b)]
+            slot = slots[id(node.b)] if a_public else slots[id(node.a)]
+            depth = circuit.depths[slot]
+            if isinstance(node, MultOp):
+                slots[id(node)] = circuit.emit(OP_MUL_CONST, slot, value, depth=depth)
+            elif isinstance(node, AddOp):
+                slots[id(node)] = circuit.emit(OP_ADD_CONST, slot, value, depth=depth)
+            elif b_public:
+                slots[id(node)] = circuit.emit(OP_ADD_CONST, slot, -value, depth=depth)
+            else:
+                slots[id(node)] = circuit.emit(OP_RSUB_CONST, value, slot, depth=depth)
+            continue
+
+        a, b = slots[id(node.a)], slots[id(node.b)]
+        depth = max(circuit.depths[a], circuit.depths[b])
+        if isinstance(node, MultOp):
+            slots[id(node)] = circuit.emit(OP_MUL, a, b, depth=depth + 1)
+        elif isinstance(node, AddOp):
+            slots[id(node)] = circuit.emit(OP_ADD, a, b, depth=depth)
+        elif isinstance(node, SubOp):
+            slots[id(node)] = circuit.emit(OP_SUB, a, b, depth=depth)
+        else:
+            raise TypeError(f"Unknown operation {node!r}")
+
+    if id(expr) in constants:
+        circuit.output = circuit.emit(OP_CONST, constants[id(expr)])
+    else:
+        circuit.output = slots[id(expr)]
+
+    return _schedule(_collapse_linear(circuit))
+
+
+def _collapse_linear(circuit: Circuit) -> Circuit:
+    """
+    Collapse every subtree of linear instructions into a single linear combination of the
+    inputs and products it reads, and fold the public factors of the multiplications.
+
+    Only the linear instructions read by a multiplication, or holding the output, are computed,
+    in their simplest form. A slot that is only a scaled slot is not computed at all: its factor
+    is carried to its readers instead, through the multiplications, so that (x * k1) * (y * k2)
+    is computed as (x * y) * (k1 * k2), with a single multiplication by a constant at the end.
+    """
+    consumers = circuit.consumers()
+    linear = [op in LINEAR_OPS for op in circuit.ops]
+    computed = [
+        linear[i] and (i == circuit.output or any(not linear[j] for j in consumers[i]))
+        for i in range(len(circuit))
+    ]
+    # Terms (coefficient by new slot) and constant of the linear instructions that are not
+    # computed, until their last reader takes them
+    pending: Dict[int, Tuple[Dict[int, int], int]] = {}
+    readers = [len(readers) for readers in consumers]
+
+    res = Circuit()
+    # New slot of each computed instruction, with the public factor its value must be multiplied by
+    scaled: List[Tuple[int, int]] = [(0, 1)] * len(circuit)
+
+    def terms(slot: int) -> Tuple[Dict[int, int], int]:
+        if not linear[slot] or computed[slot]:
+            new, factor = scaled[slot]
+            if res.ops[new] == OP_CONST:
+                return {}, _reduce(factor * res.arg_a[new])
+            return {new: factor}, 0
+        readers[slot] -= 1
+        if readers[slot] == 0:
+            return pending.pop(slot)
+        coefficients, constant = pending[slot]
+        return dict(coefficients), constant
+
+    def add(x: Dict[int, int], y: Dict[int, int], sign: int = 1) -> Dict[int, int]:
+        # Add the smallest combination into the largest one
+        if len(x) < len(y) and sign == 1:
+            x, y = y, x
+        for slot, coef in y.items():
+            x[slot] = _reduce(x.get(slot, 0) + sign * coef)
+        return x
+
+    for i in range(len(circuit)):
+        op, a, b = circuit.ops[i], circuit.arg_a[i], circuit.arg_b[i]
+        if op == OP_MUL:
+            (x, x_factor), (y, y_factor) = scaled[a], scaled[b]
+            if res.ops[x] == OP_CONST or res.ops[y] == OP_CONST:
+                # Multiplication by a public value
+                if res.ops[x] == OP_CONST:
+                    x, y, x_factor, y_factor = y, x, y_factor, x_factor
+                scaled[i] = (x, _reduce(x_factor * y_factor * res.arg_a[y]))
+            else:
+                scaled[i] = (res.emit(op, x, y, circuit.labels[i], max(res.depths[x], res.depths[y]) + 1), _reduce(x_factor * y_factor))
+            continue
+        if not linear[i]:
+            scaled[i] = (res.emit(op, a, b, circuit.labels[i], circuit.depths[i]), 1)
+            continue
+
+        if op in (OP_ADD, OP_SUB):
+            x, x_constant = terms(a)
+            # A slot read twice is only taken once from its reader count
+            y, y_constant = terms(b) if b != a else (dict(x), x_constant)
+            sign = 1 if op == OP_ADD else -1
+            combination = (add(x, y, sign), _reduce(x_constant + sign * y_constant))
+        elif op == OP_ADD_CONST:
+            x, constant = terms(a)
+            combination = (x, _reduce(constant + b))
+        elif op == OP_RSUB_CONST:
+            y, constant = terms(b)
+            combination = ({slot: -coef for slot, coef in y.items()}, _reduce(a - constant))
+        else:
+            x, constant = terms(a)
+            combination = ({slot: _reduce(coef * b) for slot, coef in x.items()}, _reduce(constant * b))
+
+        if computed[i]:
+            coefficients, constant = combination
+            scaled[i] = _emit_combination(res, {slot: coef for slot, coef in coefficients.items() if coef != 0}, constant)
+        else:
+            pending[i] = combination
+
+    output, factor = scaled[circuit.output]
+    if factor != 1:
+        if res.ops[output] == OP_CONST:
+            output = res.emit(OP_CONST, _reduce(res.arg_a[output] * factor))
+        else:
+            output = res.emit(OP_MUL_CONST, output, factor, depth=res.depths[output])
+    res.output = output
+    return res
+
+
+def _emit_combination(circuit: Circuit, coefficients: Dict[int, int], constant: int) -> Tuple[int, int]:
+    """
+    Emit a linear combination in its simplest form, returning its slot and public factor.
+    """
+    slots = list(coefficients)
+    if not slots:
+        return circuit.emit(OP_CONST, constant), 1
+
+    depth = max(circuit.depths[slot] for slot in slots)
+    if len(slots) == 1:
+        slot, coef = slots[0], coefficients[slots[0]]
+        if constant == 0:
+            return slot, coef
+        if coef == 1:
+            return circuit.emit(OP_ADD_CONST, slot, constant, depth=depth), 1
+        if coef == -1:
+            return circuit.emit(OP_RSUB_CONST, constant, slot, depth=depth), 1
+    elif len(slots) == 2 and constant == 0 and coefficients[slots[0]] == 1:
+        if coefficients[slots[1]] == 1:
+            return circuit.emit(OP_ADD, slots[0], slots[1], depth=depth), 1
+        if coefficients[slots[1]] == -1:
+            return circuit.emit(OP_SUB, slots[0], slots[1], depth=depth), 1
+
+    combination = LinearCombination(slots, [coefficients[slot] for slot in slots], constant)
+    return circuit.emit_linear(combination, depth), 1
@@ -3,12 +3,29 @@ Utilities for client communication with the trusted server.
 You should not need to change this file.
 """
 
+import abc
+import asyncio
+import base64
 import json
+import logging
 import time
-from typing import Union, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Union, Tuple
 
+import numpy as np
 import requests
 
+from metrics import Metrics
+from wire import (
+    BINARY_CONTENT_TYPE,
+    JSON_CONTENT_TYPE,
+    pack_frames,
+    unpack_elements,
+    unpack_frames,
+)
+
+
+logger = logging.getLogger("communication")
 
 def sanitize_url_param(url_param: Union[bytes, str]) -> str:
     """
@@ -24,33 +41,191 @@ def sanitize_url_param(url_param: Union[bytes, str]) -> str:
     return url_param.replace("/", "_").replace("+", "-") # type: ignore
 
 
-class Communication:
+def _encode_payload(message: Union[bytes, str]) -> str:
+    """
+    Encode a message to be embedded in a JSON batch.
+    """
+    if isinstance(message, str):
+        message = message.encode()
+    return base64.b64encode(message).decode("ASCII")
+
+
+def _decode_messages(response: requests.Response) -> Dict[str, bytes]:
+    """
+    Messages by key of a batch response, in binary frames or in JSON.
+    """
+    if response.headers.get("Content-Type") != BINARY_CONTENT_TYPE:
+        return {key: base64.b64decode(message) for key, message in response.json().items()}
+    frames = unpack_frames(response.content)
+    return {key.decode(): message for key, message in zip(frames[0::2], frames[1::2])}
+
+
+def _decode_elements(response: requests.Response) -> np.ndarray:
+    """
+    Field elements of a response, in binary or in JSON.
+    """
+    if response.headers.get("Content-Type") != BINARY_CONTENT_TYPE:
+        return np.array(response.json(), dtype=np.uint64)
+    return unpack_elements(response.content)
+
+
+def _request_size(request: requests.PreparedRequest) -> int:
+    """
+    Number of bytes of an HTTP/1.1 request: request line, headers and body.
+    """
+    body = request.body or b""
+    if isinstance(body, str):
+        body = body.encode()
+    line = f"{request.method} {request.path_url} HTTP/1.1\r\n"
+    headers = sum(len(name) + len(value) + 4 for name, value in request.headers.items())
+    return len(line) + headers + 2 + len(body)
+
+
+def _response_size(response: requests.Response) -> int:
+    """
+    Number of bytes of an HTTP/1.1 response: status line, headers and body.
+    """
+    line = f"HTTP/1.1 {response.status_code} {response.reason}\r\n"
+    headers = sum(len(name) + len(value) + 4 for name, value in response.headers.items())
+    return len(line) + headers + 2 + len(response.content)
+
+
+class Transport(abc.ABC):
+    """
+    Channel through which clients exchange messages and retrieve Beaver triplets.
+
+    A transport serves every client, so the ID of the client issuing a call is given explicitly.
+    Retrievals block until the messages are available. Transports implement the abstract methods;
+    the batch methods default to one call per message, transports override them when they can do
+    better.
+
+    The requests, poll retries and bytes of the calls of a client are recorded into the Metrics
+    registered for it, if any.
+    """
+
+    def __init__(self):
+        self.client_metrics: Dict[str, Metrics] = {}
+
+
+    def register(self, client_id: str, metrics: Metrics) -> None:
+        """
+        Record the communications of a client into `metrics`.
+        """
+        self.client_metrics[client_id] = metrics
+
+
+    def record(self, client_id: str, **counts: int) -> None:
+        metrics = self.client_metrics.get(client_id)
+        if metrics is not None:
+            metrics.record(**counts)
+
+
+    @abc.abstractmethod
+    def send_private_message(self, client_id: str, receiver_id: str, label: str, message: bytes) -> None:
+        ...
+
+
+    @abc.abstractmethod
+    def retrieve_private_message(self, client_id: str, label: str) -> bytes:
+        ...
+
+
+    @abc.abstractmethod
+    def publish_message(self, client_id: str, label: str, message: bytes) -> None:
+        ...
+
+
+    @abc.abstractmethod
+    def retrieve_public_message(self, client_id: str, sender_id: str, label: str) -> bytes:
+        ...
+
+
+    @abc.abstractmethod
+    def retrieve_beaver_triplet_shares(self, client_id: str, op_id: str) -> Tuple[int, int, int]:
+        ...
+
+
+    @abc.abstractmethod
+    def retrieve_triplet_seed(self, client_id: str) -> bytes:
+        ...
+
+
+    @abc.abstractmethod
+    def retrieve_triplet_corrections(self, client_id: str, op_ids: List[str]) -> Tuple[bytes, np.ndarray]:
+        ...
+
+
+    def send_private_messages(self, client_id: str, messages: List[Tuple[str, str, bytes]]) -> None:
+        for receiver_id, label, message in messages:
+            self.send_private_message(client_id, receiver_id, label, message)
+
+
+    def retrieve_private_messages(self, client_id: str, labels: List[str]) -> List[bytes]:
+        return [self.retrieve_private_message(client_id, label) for label in labels]
+
+
+    def retrieve_available_private_messages(self, client_id: str, labels: List[str]) -> Dict[str, bytes]:
+        return {labels[0]: self.retrieve_private_message(client_id, labels[0])}
+
+
+    def retrieve_public_messages(self, client_id: str, sender_ids: List[str], label: str) -> List[bytes]:
+        return [self.retrieve_public_message(client_id, sender_id, label) for sender_id in sender_ids]
+
+
+    def retrieve_beaver_triplet_shares_batch(self, client_id: str, op_ids: List[str]) -> List[Tuple[int, int, int]]:
+        return [self.retrieve_beaver_triplet_shares(client_id, op_id) for op_id in op_ids]
+
+
+    def set_concurrency(self, max_requests: int) -> None:
+        """
+        Prepare for up to `max_requests` calls issued at the same time.
+        """
+
+
+class HttpTransport(Transport):
     """
-    Network communications with the server.
+    Transport through the trusted server, over HTTP.
 
     Attributes:
         server_host: hostname of the server
         server_port: port of the server
-        client_id: Identifier of this client
         poll_delay: delay between requests in seconds (default: 0.2 s)
         protocol: network protocol to use (default: "http")
+        long_poll: time in seconds the server may hold a retrieval request until its message
+            is available, 0 to poll every `poll_delay` seconds instead (default: 30 s)
+        session_id: session of the server the protocol runs in, None for the default session
+        binary: exchange batches and triplets in the compact binary wire format rather than in
+            JSON (default: True)
+
+    All the requests go through a single session, so that the connection to the server is kept
+    alive and reused.
     """
 
     def __init__(
             self,
             server_host: str,
             server_port: int,
-            client_id: str,
             poll_delay: float = 0.2,
-            protocol: str = "http"
+            protocol: str = "http",
+            long_poll: float = 30.0,
+            session_id: Optional[str] = None,
+            binary: bool = True
     ):
+        super().__init__()
         self.base_url = f"{protocol}://{server_host}:{server_port}"
-        self.client_id = client_id
+        if session_id is not None:
+            self.base_url += f"/sessions/{sanitize_url_param(session_id)}"
         self.poll_delay = poll_delay
+        self.long_poll = long_poll
+        self.binary = binary
+        self.session = requests.Session()
+        if binary:
+            self.session.headers["Accept"] = f"{BINARY_CONTENT_TYPE}, {JSON_CONTENT_TYPE};q=0.5"
 
 
     def send_private_message(
             self,
+            client_id: str,
             receiver_id: str,
             label: str,
             message: Union[bytes, str]
@@ -59,39 +234,34 @@ class Communication:
         Send a private message to the server.
         """
 
-        client_id_san = sanitize_url_param(self.client_id)
+        client_id_san = sanitize_url_param(client_id)
         receiver_id_san = sanitize_url_param(receiver_id)
         label_san = sanitize_url_param(label)
 
         url = f"{self.base_url}/private/{client_id_san}/{receiver_id_san}/{label_san}"
-        print(f"POST {url}")
-        requests.post(url, message)
+        logger.debug("POST %s", url)
+        self._request(client_id, "POST", url, data=message).raise_for_status()
 
 
     def retrieve_private_message(
             self,
+            client_id: str,
             label: str
         ) -> bytes:
         """
         Retrieve a private message from the server.
         """
 
-        client_id_san = sanitize_url_param(self.client_id)
+        client_id_san = sanitize_url_param(client_id)
         label_san = sanitize_url_param(label)
 
         url = f"{self.base_url}/private/{client_id_san}/{label_san}"
-        # We can either use a websocket, or do some polling, but websockets would require asyncio.
-        # So we are doing polling to avoid introducing a new programming paradigm.
-        while True:
-            print(f"GET  {url}")
-            res = requests.get(url)
-            if res.status_code == 200:
-                return res.content
-            time.sleep(self.poll_delay)
+        return self._poll(client_id, url)
 
 
     def publish_message(
             self,
+            client_id: str,
             label: str,
             message: Union[bytes, str]
         ) -> None:
@@ -99,16 +269,17 @@ class Communication:
         Publish a message on the server.
         """
 
-        client_id_san = sanitize_url_param(self.client_id)
+        client_id_san = sanitize_url_param(client_id)
         label_san = sanitize_url_param(label)
 
         url = f"{self.base_url}/public/{client_id_san}/{label_san}"
-        print(f"POST {url}")
-        requests.post(url, message)
+        logger.debug("POST %s", url)
+        self._request(client_id, "POST", url, data=message).raise_for_status()
 
 
     def retrieve_public_message(
             self,
+            client_id: str,
             sender_id: str,
             label: str
         ) -> bytes:
@@ -116,35 +287,474 @@ class Communication:
         Retrieve a public message from the server.
         """
 
-        client_id_san = sanitize_url_param(self.client_id)
+        client_id_san = sanitize_url_param(client_id)
         sender_id_san = sanitize_url_param(sender_id)
         label_san = sanitize_url_param(label)
 
         url = f"{self.base_url}/public/{client_id_san}/{sender_id_san}/{label_san}"
+        return self._poll(client_id, url)
+
 
-        # We can either use a websocket, or do some polling, but websockets would require asyncio.
-        # So we are doing polling to avoid introducing a new programming paradigm.
+    def send_private_messages(
+            self,
+            client_id: str,
+            messages: List[Tuple[str, str, Union[bytes, str]]]
+        ) -> None:
+        """
+        Send several private messages to the server in a single request.
+        The messages are given as (receiver_id, label, message) tuples.
+        """
+
+        client_id_san = sanitize_url_param(client_id)
+        if self.binary:
+            body = pack_frames([
+                frame
+                for receiver_id, label, message in messages
+                for frame in (sanitize_url_param(receiver_id), sanitize_url_param(label), message)
+            ])
+            headers = {"Content-Type": BINARY_CONTENT_TYPE}
+        else:
+            body = json.dumps([
+                [sanitize_url_param(receiver_id), sanitize_url_param(label), _encode_payload(message)]
+                for receiver_id, label, message in messages
+            ]).encode()
+            headers = {"Content-Type": JSON_CONTENT_TYPE}
+
+        url = f"{self.base_url}/private/{client_id_san}"
+        logger.debug("POST %s", url)
+        self._request(client_id, "POST", url, data=body, headers=headers).raise_for_status()
+
+
+    def retrieve_private_messages(
+            self,
+            client_id: str,
+            labels: List[str]
+        ) -> List[bytes]:
+        """
+        Retrieve several private messages from the server, with as few requests as possible.
+        """
+
+        client_id_san = sanitize_url_param(client_id)
+        labels_san = [sanitize_url_param(label) for label in labels]
+
+        url = f"{self.base_url}/private/{client_id_san}"
+        res = self._poll_many(client_id, url, "labels", labels_san)
+        return [res[label] for label in labels_san]
+
+
+    def retrieve_available_private_messages(
+            self,
+            client_id: str,
+            labels: List[str]
+        ) -> Dict[str, bytes]:
+        """
+        Retrieve the private messages already available among several, by label, waiting until
+        at least one of them is.
+        """
+
+        client_id_san = sanitize_url_param(client_id)
+        labels_san = {sanitize_url_param(label): label for label in labels}
+
+        url = f"{self.base_url}/private/{client_id_san}"
+        params = {"labels": ",".join(labels_san), "any": 1}
+        if self.long_poll > 0:
+            params["wait"] = self.long_poll
         while True:
-            print(f"GET  {url}")
-            res = requests.get(url)
-            if res.status_code == 200:
-                return res.content
-            time.sleep(self.poll_delay)
+            logger.debug("GET  %s", url)
+            response = self._request(client_id, "GET", url, params=params)
+            response.raise_for_status()
+            res = _decode_messages(response)
+            if res:
+                return {labels_san[label]: message for label, message in res.items()}
+
+            self.record(client_id, poll_retries=1)
+            if self.long_poll <= 0:
+                time.sleep(self.poll_delay)
+
+
+    def retrieve_public_messages(
+            self,
+            client_id: str,
+            sender_ids: List[str],
+            label: str
+        ) -> List[bytes]:
+        """
+        Retrieve the public messages published by several senders under a same label, with as few
+        requests as possible.
+        """
+
+        client_id_san = sanitize_url_param(client_id)
+        sender_ids_san = [sanitize_url_param(sender_id) for sender_id in sender_ids]
+        label_san = sanitize_url_param(label)
+
+        url = f"{self.base_url}/public/{client_id_san}/{label_san}"
+        res = self._poll_many(client_id, url, "senders", sender_ids_san)
+        return [res[sender_id] for sender_id in sender_ids_san]
 
 
     def retrieve_beaver_triplet_shares(
             self,
+            client_id: str,
             op_id: str
         ) -> Tuple[int, int, int]:
         """
         Retrieve a triplet of shares generated by the trusted server.
         """
 
-        client_id_san = sanitize_url_param(self.client_id)
+        client_id_san = sanitize_url_param(client_id)
         op_id_san = sanitize_url_param(op_id)
 
         url = f"{self.base_url}/shares/{client_id_san}/{op_id_san}"
-        print(f"GET  {url}")
+        logger.debug("GET  %s", url)
+
+        res = self._request(client_id, "GET", url)
+        return tuple(_decode_elements(res).tolist()) # type: ignore
+
+
+    def retrieve_beaver_triplet_shares_batch(
+            self,
+            client_id: str,
+            op_ids: List[str]
+        ) -> List[Tuple[int, int, int]]:
+        """
+        Retrieve the triplets of shares of several operations in a single request.
+        """
+
+        client_id_san = sanitize_url_param(client_id)
+        op_ids_san = ",".join(sanitize_url_param(op_id) for op_id in op_ids)
+
+        url = f"{self.base_url}/shares/{client_id_san}"
+        logger.debug("POST %s", url)
+
+        res = self._request(client_id, "POST", url, data=op_ids_san)
+        if res.headers.get("Content-Type") != BINARY_CONTENT_TYPE:
+            return [tuple(triplet) for triplet in res.json()] # type: ignore
+        return [tuple(triplet) for triplet in _decode_elements(res).reshape(-1, 3).tolist()] # type: ignore
+
+
+    def retrieve_triplet_seed(self, client_id: str) -> bytes:
+        """
+        Retrieve the seed the client shares with the trusted parameter generator.
+        """
+
+        client_id_san = sanitize_url_param(client_id)
+
+        url = f"{self.base_url}/seeds/{client_id_san}"
+        logger.debug("GET %s", url)
+
+        return self._request(client_id, "GET", url).content
+
+
+    def retrieve_triplet_corrections(self, client_id: str, op_ids: List[str]) -> Tuple[bytes, np.ndarray]:
+        """
+        Retrieve the nonce of the seeded triplets of several operations, with the corrections of
+        the shares of c of the client, in a single request.
+        """
+
+        client_id_san = sanitize_url_param(client_id)
+        op_ids_san = ",".join(sanitize_url_param(op_id) for op_id in op_ids)
+
+        url = f"{self.base_url}/corrections/{client_id_san}"
+        logger.debug("POST %s", url)
+
+        res = self._request(client_id, "POST", url, data=op_ids_san)
+        if res.headers.get("Content-Type") != BINARY_CONTENT_TYPE:
+            body = res.json()
+            return base64.b64decode(body["nonce"]), np.array(body["corrections"], dtype=np.uint64)
+        nonce, corrections = unpack_frames(res.content)
+        return nonce, unpack_elements(corrections)
+
+
+    def _poll_many(self, client_id: str, url: str, param: str, keys: List[str]) -> Dict[str, bytes]:
+        """
+        Retrieve several messages, until all of them are available. Each request only asks for
+        the messages that were not received yet, given comma-separated in the `param` parameter.
+        """
+        res: Dict[str, bytes] = {}
+        missing = list(dict.fromkeys(keys))
+        while missing:
+            params = {param: ",".join(missing)}
+            if self.long_poll > 0:
+                params["wait"] = self.long_poll
+
+            logger.debug("GET  %s", url)
+            response = self._request(client_id, "GET", url, params=params)
+            response.raise_for_status()
+            res.update(_decode_messages(response))
+
+            missing = [key for key in missing if key not in res]
+            if missing:
+                self.record(client_id, poll_retries=1)
+                if self.long_poll <= 0:
+                    time.sleep(self.poll_delay)
+
+        return res
+
+
+    def _poll(self, client_id: str, url: str) -> bytes:
+        """
+        Retrieve a message, until it is available.
+        """
+        # With long polling, the server holds the request until the message is available (or the
+        # wait time elapsed), so the request can be reissued right away. Otherwise, we are doing
+        # plain polling to avoid introducing websockets and asyncio.
+        params = {"wait": self.long_poll} if self.long_poll > 0 else None
+        while True:
+            logger.debug("GET  %s", url)
+            res = self._request(client_id, "GET", url, params=params)
+            if res.status_code == 200:
+                return res.content
+            if res.status_code != 404:
+                res.raise_for_status()
+            self.record(client_id, poll_retries=1)
+            if params is None:
+                time.sleep(self.poll_delay)
+
+
+    def _request(self, client_id: str, method: str, url: str, **kwargs) -> requests.Response:
+        """
+        Issue a request through the session, recording its size on the wire.
+        """
+        res = self.session.request(method, url, **kwargs)
+        self.record(client_id, requests=1, bytes_out=_request_size(res.request), bytes_in=_response_size(res))
+        return res
+
+
+    def set_concurrency(self, max_requests: int) -> None:
+        # Keep a pooled connection per concurrent request
+        adapter = requests.adapters.HTTPAdapter(pool_maxsize=max_requests)
+        self.session.mount(self.base_url, adapter)
+
+
+class Communication:
+    """
+    Communications of a client with the other clients and the trusted parameter generator.
+
+    Attributes:
+        server_host: hostname of the server
+        server_port: port of the server
+        client_id: Identifier of this client
+        poll_delay: delay between requests in seconds (default: 0.2 s)
+        protocol: network protocol to use (default: "http")
+        long_poll: time in seconds the server may hold a retrieval request until its message
+            is available, 0 to poll every `poll_delay` seconds instead (default: 30 s)
+        session_id: session of the server the protocol runs in, None for the default session
+        transport: transport to use instead of HTTP requests to the server, in which case the
+            other parameters are ignored (default: None)
+    """
+
+    def __init__(
+            self,
+            server_host: str,
+            server_port: int,
+            client_id: str,
+            poll_delay: float = 0.2,
+            protocol: str = "http",
+            long_poll: float = 30.0,
+            session_id: Optional[str] = None,
+            transport: Optional[Transport] = None
+    ):
+        if transport is None:
+            transport = HttpTransport(server_host, server_port, poll_delay, protocol, long_poll, session_id)
+        self.transport = transport
+        self.client_id = client_id
+        self.metrics = Metrics()
+        transport.register(client_id, self.metrics)
+
+
+    def send_private_message(self, receiver_id: str, label: str, message: Union[bytes, str]) -> None:
+        """
+        Send a private message.
+        """
+        self.transport.send_private_message(self.client_id, receiver_id, label, message)
+
+
+    def retrieve_private_message(self, label: str) -> bytes:
+        """
+        Retrieve a private message.
+        """
+        return self.transport.retrieve_private_message(self.client_id, label)
+
+
+    def publish_message(self, label: str, message: Union[bytes, str]) -> None:
+        """
+        Publish a message.
+        """
+        self.transport.publish_message(self.client_id, label, message)
+
+
+    def retrieve_public_message(self, sender_id: str, label: str) -> bytes:
+        """
+        Retrieve a public message.
+        """
+        return self.transport.retrieve_public_message(self.client_id, sender_id, label)
+
+
+    def send_private_messages(self, messages: List[Tuple[str, str, Union[bytes, str]]]) -> None:
+        """
+        Send several private messages, given as (receiver_id, label, message) tuples.
+        """
+        self.transport.send_private_messages(self.client_id, messages)
+
+
+    def retrieve_private_messages(self, labels: List[str]) -> List[bytes]:
+        """
+        Retrieve several private messages.
+        """
+        return self.transport.retrieve_private_messages(self.client_id, labels)
+
+
+    def retrieve_available_private_messages(self, labels: List[str]) -> Dict[str, bytes]:
+        """
+        Retrieve the private messages already available among several, by label, waiting until
+        at least one of them is.
+        """
+        return self.transport.retrieve_available_private_messages(self.client_id, labels)
+
+
+    def retrieve_public_messages(self, sender_ids: List[str], label: str) -> List[bytes]:
+        """
+        Retrieve the public messages published by several senders under a same label.
+        """
+        return self.transport.retrieve_public_messages(self.client_id, sender_ids, label)
+
+
+    def retrieve_beaver_triplet_shares(self, op_id: str) -> Tuple[int, int, int]:
+        """
+        Retrieve a triplet of shares generated by the trusted parameter generator.
+        """
+        return self.transport.retrieve_beaver_triplet_shares(self.client_id, op_id)
+
+
+    def retrieve_beaver_triplet_shares_batch(self, op_ids: List[str]) -> List[Tuple[int, int, int]]:
+        """
+        Retrieve the triplets of shares of several operations at once.
+        """
+        return self.transport.retrieve_beaver_triplet_shares_batch(self.client_id, op_ids)
+
+
+    def retrieve_triplet_seed(self) -> bytes:
+        """
+        Retrieve the seed shared with the trusted parameter generator, from which the shares of
+        the seeded triplets are expanded.
+        """
+        return self.transport.retrieve_triplet_seed(self.client_id)
+
+
+    def retrieve_triplet_corrections(self, op_ids: List[str]) -> Tuple[bytes, np.ndarray]:
+        """
+        Retrieve the nonce of the seeded triplets of several operations, with the corrections of
+        own shares of c (empty, unless this client is the last participant).
+        """
+        return self.transport.retrieve_triplet_corrections(self.client_id, op_ids)
+
+
+def create_session(
+        server_host: str,
+        server_port: int,
+        session_id: str,
+        participant_ids: List[str],
+        triplets: int = 0,
+        protocol: str = "http"
+    ) -> None:
+    """
+    Create a session on the server, for a protocol run between the given participants.
+    `triplets` Beaver triplets are pregenerated for the session in the background.
+    """
+    url = f"{protocol}://{server_host}:{server_port}/sessions/{sanitize_url_param(session_id)}"
+    body = json.dumps({
+        "participants": [sanitize_url_param(pid) for pid in participant_ids],
+        "triplets": triplets,
+    })
+    logger.debug("POST %s", url)
+    requests.post(url, body).raise_for_status()
+
+
+def delete_session(server_host: str, server_port: int, session_id: str, protocol: str = "http") -> None:
+    """
+    Destroy a session on the server, with all its messages and triplets.
+    """
+    url = f"{protocol}://{server_host}:{server_port}/sessions/{sanitize_url_param(session_id)}"
+    logger.debug("DELETE %s", url)
+    requests.delete(url)
+
+
+def wait_for_server(base_url: str, timeout: float = 10.0) -> None:
+    """
+    Wait until the server answers, instead of sleeping a fixed time.
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            requests.get(f"{base_url}/stats")
+            return
+        except requests.ConnectionError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.05)
+
+
+class AsyncCommunication:
+    """
+    Asynchronous network communications with the server.
+
+    Every request of the wrapped Communication is run in a thread pool, so that many requests
+    can be issued concurrently and awaited together from an asyncio event loop.
+
+    Attributes:
+        comm: synchronous communications used to perform the requests
+        max_workers: maximum number of requests run at the same time
+    """
+
+    def __init__(self, comm: Communication, max_workers: Optional[int] = None):
+        self.comm = comm
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        if max_workers is not None:
+            self.comm.transport.set_concurrency(max_workers)
+
+
+    def close(self) -> None:
+        """
+        Release the thread pool.
+        """
+        self.executor.shutdown(wait=False)
+
+
+    async def _run(self, func: Callable, *args) -> Any:
+        return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+
+
+    async def send_private_message(self, receiver_id: str, label: str, message: Union[bytes, str]) -> None:
+        await self._run(self.comm.send_private_message, receiver_id, label, message)
+
+
+    async def send_private_messages(self, messages: List[Tuple[str, str, Union[bytes, str]]]) -> None:
+        await self._run(self.comm.send_private_messages, messages)
+
+
+    async def retrieve_private_message(self, label: str) -> bytes:
+        return await self._run(self.comm.retrieve_private_message, label)
+
+
+    async def retrieve_private_messages(self, labels: List[str]) -> List[bytes]:
+        return await self._run(self.comm.retrieve_private_messages, labels)
+
+
+    async def publish_message(self, label: str, message: Union[bytes, str]) -> None:
+        await self._run(self.comm.publish_message, label, message)
+
+
+    async def retrieve_public_message(self, sender_id: str, label: str) -> bytes:
+        return await self._run(self.comm.retrieve_public_message, sender_id, label)
+
+
+    async def retrieve_beaver_triplet_shares_batch(self, op_ids: List[str]) -> List[Tuple[int, int, int]]:
+        return await self._run(self.comm.retrieve_beaver_triplet_shares_batch, op_ids)
+
+
+    async def retrieve_triplet_seed(self) -> bytes:
+        return await self._run(self.comm.retrieve_triplet_seed)
+
 
-        res = requests.get(url)
-        return tuple(json.loads(res.text)) # type: ignore
+    async def retrieve_triplet_corrections(self, op_ids: List[str]) -> Tuple[bytes, np.ndarray]:
+        return await self._run(self.comm.retrieve_triplet_corrections, op_ids)
@@ -6,16 +6,25 @@ Example expression:
 >>> bob_secret = Secret()
 >>> expr = alice_secret * bob_secret * Scalar(2)
 
+The same expression computes element-wise over arrays of values (vector mode) when the
+secrets are given sequences of values, scalars applying to every element:
+>>> alice_values = {alice_secret: [3, 1, 4, 1, 5]}
+
 MODIFY THIS FILE.
 """
 
 import base64
 import random
-from typing import Optional
+import weakref
+from typing import Optional, Sequence, Union
 
 
 ID_BYTES = 4
 
+# Operation nodes currently alive, by structure, so that building twice the same
+# operation on the same operands gives back the same node (hash-consing).
+_nodes: weakref.WeakValueDictionary = weakref.WeakValueDictionary()
+
 
 def gen_id() -> bytes:
     id_bytes = bytearray(
@@ -24,6 +33,25 @@ def gen_id() -> bytes:
     return base64.b64encode(id_bytes)
 
 
+def make_op(op_class: type, a: "Expression", b: "Expression") -> "Expression":
+    """
+    Build an operation node, or reuse the existing node with the same operation and operands.
+    The operands of commutative operations are ordered, so that a * b and b * a are shared.
+
+    Operands are identified by their identity rather than their random IDs, which may collide.
+    A node keeps its operands alive, so their identities cannot be reused while it is cached.
+    """
+    key = (op_class, id(a), id(b))
+    if op_class is not SubOp and id(b) < id(a):
+        key = (op_class, id(b), id(a))
+
+    node = _nodes.get(key)
+    if node is None:
+        node = op_class(a, b)
+        _nodes[key] = node
+    return node
+
+
 class Expression:
     """
     Base class for an arithmetic expression.
@@ -38,13 +66,13 @@ class Expression:
         self.id = id
 
     def __add__(self, other):
-        return AddOp(self, other)
+        return make_op(AddOp, self, other)
 
     def __sub__(self, other):
-        return SubOp(self, other)
+        return make_op(SubOp, self, other)
 
     def __mul__(self, other):
-        return MultOp(self, other)        
+        return make_op(MultOp, self, other)
 
 
     def __hash__(self):
@@ -78,10 +106,10 @@ class Scalar(Expression):
 
 
 class Secret(Expression):
-    """Term representing a secret finite field value (variable)."""
+    """Term representing a secret finite field value (variable), or an array of values in vector mode."""
     def __init__(
             self,
-            value: Optional[int] = None,
+            value: Optional[Union[int, Sequence[int]]] = None,
             id: Optional[bytes] = None
         ):
         self.value = value
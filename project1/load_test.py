@@ -0,0 +1,132 @@
+"""
+Load test of the trusted server.
+
+Simulated parties run rounds of the message pattern of the SMC protocol: every party publishes a
+message, then retrieves the message of every party. The throughput of the server (requests/s)
+and the latency percentiles of the requests are reported for several numbers of parties.
+
+A retrieval is first tried without waiting, and only long polls when the message is not there
+yet. The latencies only cover the requests answered right away; the time the long polling
+requests are held is reported separately, as it measures the other parties, not the server.
+
+Usage:
+    python3 load_test.py [--parties 10 50 150] [--rounds 5] [--port 5001]
+"""
+
+import argparse
+import csv
+import statistics
+import threading
+import time
+from multiprocessing import Process
+from typing import Dict, List
+
+import requests
+
+from communication import wait_for_server
+from server import run
+
+
+def smc_server(port: int, participants: List[str]) -> None:
+    run("localhost", port, participants, log_level="WARNING")
+
+
+def simulated_party(
+        base_url: str,
+        party_id: str,
+        participants: List[str],
+        rounds: int,
+        latencies: List[float],
+        waits: List[float]) -> None:
+    """
+    Publish a message and retrieve the messages of every party, `rounds` times.
+    The latency of every request answered right away is appended to `latencies`, and the
+    duration of every long polling request to `waits`.
+    """
+    session = requests.Session()
+    own_latencies = []
+    own_waits = []
+
+    def timed(durations, method, url, **kwargs):
+        start = time.perf_counter()
+        res = method(url, **kwargs)
+        durations.append(time.perf_counter() - start)
+        return res
+
+    for round_idx in range(rounds):
+        timed(own_latencies, session.post, f"{base_url}/public/{party_id}/round{round_idx}", data=b"0" * 20)
+        for sender_id in participants:
+            url = f"{base_url}/public/{party_id}/{sender_id}/round{round_idx}"
+            if timed(own_latencies, session.get, url).status_code == 200:
+                continue
+            while timed(own_waits, session.get, url, params={"wait": 30}).status_code != 200:
+                pass
+
+    latencies.extend(own_latencies)
+    waits.extend(own_waits)
+
+
+def load_test(num_parties: int, rounds: int, port: int) -> Dict[str, float]:
+    """
+    Run a server and `num_parties` simulated parties, and measure the requests.
+    """
+    participants = [str(i) for i in range(num_parties)]
+    base_url = f"http://localhost:{port}"
+
+    server = Process(target=smc_server, args=(port, participants))
+    server.start()
+    try:
+        wait_for_server(base_url)
+
+        latencies: List[float] = []
+        waits: List[float] = []
+        parties = [
+            threading.Thread(target=simulated_party, args=(base_url, pid, participants, rounds, latencies, waits))
+            for pid in participants
+        ]
+
+        start = time.perf_counter()
+        for party in parties:
+            party.start()
+        for party in parties:
+            party.join()
+        duration = time.perf_counter() - start
+    finally:
+        server.terminate()
+        server.join()
+
+    latencies.sort()
+    return {
+        "Requests": len(latencies) + len(waits),
+        "Requests/s": (len(latencies) + len(waits)) / duration,
+        "p50 latency (ms)": 1000 * statistics.median(latencies),
+        "p99 latency (ms)": 1000 * latencies[min(len(latencies) - 1, int(0.99 * len(latencies)))],
+        "Long polls": len(waits),
+        "Mean wait (ms)": 1000 * statistics.mean(waits) if waits else 0.0,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Load test of the trusted server.")
+    parser.add_argument("--parties", type=int, nargs="+", default=[10, 50, 150])
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--port", type=int, default=5001)
+    parser.add_argument("--output", default="perf_eval/Server load.csv")
+    args = parser.parse_args()
+
+    columns = [
+        "Parties", "Requests", "Requests/s", "p50 latency (ms)", "p99 latency (ms)", "Long polls", "Mean wait (ms)",
+    ]
+    with open(args.output, "w", newline="") as output:
+        writer = csv.DictWriter(output, fieldnames=columns)
+        writer.writeheader()
+        for num_parties in args.parties:
+            print(f"----- Load test with {num_parties} parties")
+            res = load_test(num_parties, args.rounds, args.port)
+            res["Parties"] = num_parties
+            writer.writerow(res)
+            print(", ".join(f"{key}: {round(res[key], 2)}" for key in columns[1:]))
+
+
+if __name__ == "__main__":
+    main()
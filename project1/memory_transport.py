@@ -0,0 +1,158 @@
+"""
+In-memory transport, for running all the clients of a protocol in a single process.
+
+The clients exchange messages through shared stores instead of HTTP requests to the trusted
+server, so that a run only measures the cost of the protocol itself:
+>>> transport = MemoryTransport(["Alice", "Bob"])
+>>> alice = SMCParty("Alice", None, None, prot, alice_values, transport=transport)
+
+Every client must then run in its own thread (or asyncio client), as retrievals block until
+the messages are available.
+"""
+
+from typing import (
+    Dict,
+    Hashable,
+    List,
+    Tuple,
+    Union,
+)
+
+import numpy as np
+
+from communication import Transport
+from storage import ChannelStore
+from ttp import TrustedParamGenerator
+
+
+class MemoryTransport(Transport):
+    """
+    Transport through stores shared by the clients of a same process, with the same semantics
+    as the trusted server: a private message is consumed by its receiver, a public message once
+    every participant retrieved it.
+
+    Every call is recorded as a request, of the size of its messages (8 bytes per share of a
+    triplet or correction), as there is no wire.
+
+    Attributes:
+        participant_ids: IDs of the clients of the protocol
+        triplets: number of Beaver triplets to pregenerate in the background (default: 0)
+        wait: time in seconds a retrieval waits on the store before checking again (default: 30 s)
+    """
+
+    def __init__(self, participant_ids: List[str], triplets: int = 0, wait: float = 30.0):
+        super().__init__()
+        self.store: Dict[str, ChannelStore] = {"private": ChannelStore(), "public": ChannelStore()}
+        self.ttp = TrustedParamGenerator()
+        for participant_id in participant_ids:
+            self.ttp.add_participant(participant_id)
+        if triplets > 0:
+            self.ttp.preprocess(triplets)
+        self.wait = wait
+
+
+    def send_private_message(self, client_id: str, receiver_id: str, label: str, message: Union[bytes, str]) -> None:
+        data = _to_bytes(message)
+        self.record(client_id, requests=1, bytes_out=len(data))
+        self.store["private"].set((receiver_id, label), data, [receiver_id])
+
+
+    def retrieve_private_message(self, client_id: str, label: str) -> bytes:
+        return self._get(client_id, "private", (client_id, label))
+
+
+    def publish_message(self, client_id: str, label: str, message: Union[bytes, str]) -> None:
+        data = _to_bytes(message)
+        self.record(client_id, requests=1, bytes_out=len(data))
+        self.store["public"].set((client_id, label), data, self.ttp.participant_ids)
+
+
+    def retrieve_public_message(self, client_id: str, sender_id: str, label: str) -> bytes:
+        return self._get(client_id, "public", (sender_id, label))
+
+
+    def send_private_messages(self, client_id: str, messages: List[Tuple[str, str, Union[bytes, str]]]) -> None:
+        data = [(receiver_id, label, _to_bytes(message)) for receiver_id, label, message in messages]
+        self.record(client_id, requests=1, bytes_out=sum(len(message) for _, _, message in data))
+        for receiver_id, label, message in data:
+            self.store["private"].set((receiver_id, label), message, [receiver_id])
+
+
+    def retrieve_private_messages(self, client_id: str, labels: List[str]) -> List[bytes]:
+        channels = [(client_id, label) for label in labels]
+        res = self._get_many(client_id, "private", channels)
+        return [res[channel] for channel in channels]
+
+
+    def retrieve_available_private_messages(self, client_id: str, labels: List[str]) -> Dict[str, bytes]:
+        channels = [(client_id, label) for label in labels]
+        while True:
+            found = self.store["private"].get_many(channels, client_id, self.wait, wait_any=True)
+            self.record(client_id, requests=1, bytes_in=sum(len(data) for data in found.values()))
+            if found:
+                return {label: data for (_, label), data in found.items()}
+            self.record(client_id, poll_retries=1)
+
+
+    def retrieve_public_messages(self, client_id: str, sender_ids: List[str], label: str) -> List[bytes]:
+        channels = [(sender_id, label) for sender_id in sender_ids]
+        res = self._get_many(client_id, "public", channels)
+        return [res[channel] for channel in channels]
+
+
+    def retrieve_beaver_triplet_shares(self, client_id: str, op_id: str) -> Tuple[int, int, int]:
+        a, b, c = self.ttp.retrieve_share(client_id, op_id)
+        self.record(client_id, requests=1, bytes_in=3 * 8)
+        return a.value, b.value, c.value
+
+
+    def retrieve_beaver_triplet_shares_batch(self, client_id: str, op_ids: List[str]) -> List[Tuple[int, int, int]]:
+        triplets = self.ttp.retrieve_shares(client_id, op_ids)
+        self.record(client_id, requests=1, bytes_in=3 * 8 * len(triplets))
+        return [(a.value, b.value, c.value) for a, b, c in triplets]
+
+
+    def retrieve_triplet_seed(self, client_id: str) -> bytes:
+        seed = self.ttp.retrieve_seed(client_id)
+        self.record(client_id, requests=1, bytes_in=len(seed))
+        return seed
+
+
+    def retrieve_triplet_corrections(self, client_id: str, op_ids: List[str]) -> Tuple[bytes, np.ndarray]:
+        nonce, corrections = self.ttp.retrieve_corrections(client_id, op_ids)
+        self.record(client_id, requests=1, bytes_in=len(nonce) + corrections.nbytes)
+        return nonce, corrections
+
+
+    def _get(self, client_id: str, pool: str, channel: Hashable) -> bytes:
+        """
+        Retrieve a message, waiting until it is available.
+        """
+        while True:
+            data = self.store[pool].get(channel, client_id, self.wait)
+            if data is not None:
+                self.record(client_id, requests=1, bytes_in=len(data))
+                return data
+            self.record(client_id, requests=1, poll_retries=1)
+
+
+    def _get_many(self, client_id: str, pool: str, channels: List[Hashable]) -> Dict[Hashable, bytes]:
+        """
+        Retrieve several messages, waiting until all of them are available.
+        """
+        res: Dict[Hashable, bytes] = {}
+        missing = list(dict.fromkeys(channels))
+        while True:
+            found = self.store[pool].get_many(missing, client_id, self.wait)
+            res.update(found)
+            missing = [channel for channel in missing if channel not in res]
+            self.record(client_id, requests=1, bytes_in=sum(len(data) for data in found.values()))
+            if not missing:
+                return res
+            self.record(client_id, poll_retries=1)
+
+
+def _to_bytes(message: Union[bytes, str]) -> bytes:
+    if isinstance(message, str):
+        return message.encode()
+    return message
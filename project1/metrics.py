@@ -0,0 +1,126 @@
+"""
+Instrumentation of the phases of a protocol run.
+
+Communications are recorded into the phase a client is currently in:
+>>> metrics = Metrics()
+>>> with metrics.phase("share distribution"):
+...     metrics.record(requests=1, bytes_out=120)
+>>> metrics.to_dict()["phases"]["share distribution"]["bytes_out"]
+120
+"""
+
+import collections
+import contextlib
+import json
+import threading
+import time
+from typing import Dict, Iterator, List, Tuple
+
+
+# Phase of the communications happening outside of any phase
+OTHER_PHASE = "other"
+
+FIELDS = ["wall_time", "requests", "poll_retries", "bytes_in", "bytes_out"]
+
+
+class PhaseMetrics:
+    """
+    Measures of a phase.
+
+    Attributes:
+        wall_time: time in seconds spent in the phase, excluding the phases nested in it
+        requests: number of requests issued
+        poll_retries: number of retrievals reissued because their messages were not available yet
+        bytes_in: number of bytes received on the wire
+        bytes_out: number of bytes sent on the wire
+    """
+
+    __slots__ = FIELDS
+
+    def __init__(self):
+        self.wall_time = 0.0
+        self.requests = 0
+        self.poll_retries = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+
+    def to_dict(self) -> Dict[str, float]:
+        return {field: getattr(self, field) for field in FIELDS}
+
+
+class Metrics:
+    """
+    Measures of every phase of a run, in the order the phases were entered.
+
+    Communications may be recorded from several threads, but phases are entered by a single one.
+    """
+
+    def __init__(self):
+        self.phases: "collections.OrderedDict[str, PhaseMetrics]" = collections.OrderedDict()
+        # Phases entered and not exited yet, with the time their current stretch started
+        self.stack: List[Tuple[PhaseMetrics, float]] = []
+        self.lock = threading.Lock()
+
+
+    @contextlib.contextmanager
+    def phase(self, name: str) -> Iterator[PhaseMetrics]:
+        """
+        Record the time and communications of a phase. The time of the phases nested in it is
+        only counted for the nested phases, so that the times of all the phases add up.
+        """
+        phase = self._get(name)
+        now = time.perf_counter()
+        if self.stack:
+            outer, start = self.stack[-1]
+            outer.wall_time += now - start
+        self.stack.append((phase, now))
+        try:
+            yield phase
+        finally:
+            now = time.perf_counter()
+            _, start = self.stack.pop()
+            phase.wall_time += now - start
+            if self.stack:
+                self.stack[-1] = (self.stack[-1][0], now)
+
+
+    def record(self, requests: int = 0, poll_retries: int = 0, bytes_in: int = 0, bytes_out: int = 0) -> None:
+        """
+        Record communications into the current phase.
+        """
+        phase = self.stack[-1][0] if self.stack else self._get(OTHER_PHASE)
+        with self.lock:
+            phase.requests += requests
+            phase.poll_retries += poll_retries
+            phase.bytes_in += bytes_in
+            phase.bytes_out += bytes_out
+
+
+    def total(self) -> Dict[str, float]:
+        """
+        Measures summed over all the phases.
+        """
+        res = PhaseMetrics().to_dict()
+        for phase in self.phases.values():
+            for field, value in phase.to_dict().items():
+                res[field] += value
+        return res
+
+
+    def to_dict(self) -> Dict[str, Dict]:
+        return {
+            "phases": {name: phase.to_dict() for name, phase in self.phases.items()},
+            "total": self.total(),
+        }
+
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict())
+
+
+    def _get(self, name: str) -> PhaseMetrics:
+        with self.lock:
+            if name not in self.phases:
+                self.phases[name] = PhaseMetrics()
+            return self.phases[name]
@@ -5,13 +5,16 @@ ALL EXISTING TESTS IN THIS SUITE SHOULD PASS WITHOUT ANY MODIFICATION TO THEM.
 """
 
 import statistics
+import threading
 import time
 from statistics import mean
 from multiprocessing import Process, Queue
 import pandas as pd
 import pytest
 
+from communication import create_session, delete_session, wait_for_server
 from expression import Expression, Scalar, Secret
+from memory_transport import MemoryTransport
 from protocol import ProtocolSpec
 from server import run
 import matplotlib.pyplot as plt
@@ -21,7 +24,11 @@ import sys
 
 from smc_party import SMCParty
 
-sys.setrecursionlimit(5000)
+# Opt in to run the parties as threads communicating in memory, instead of processes talking to
+# the server over HTTP. The results of such runs only measure the protocol, so they are saved
+# under titles of their own, not to be compared with the HTTP results.
+IN_MEMORY = False
+
 
 ### Make a plot of the given csv file
 def make_plot(title, csv_file):
@@ -67,13 +74,30 @@ class PerformanceEvaluator:
     self.computation_times = []
     self.bytes_in = []
     self.bytes_out = []
-    self.title = title
+    self.phase_metrics = []
+    self.phases_df = pd.DataFrame()
+    self.title = f"{title} (in memory)" if IN_MEMORY else title
 
   # Adds the given evaluation results to the list of parties' results 
-  def performance_eval_callback(self, client_id, computation_time, bytes_in, bytes_out):
+  def performance_eval_callback(self, client_id, computation_time, bytes_in, bytes_out, metrics=None):
     self.computation_times.append(computation_time)
     self.bytes_in.append(bytes_in)
     self.bytes_out.append(bytes_out)
+    if metrics is not None:
+      self.phase_metrics.append(metrics)
+
+  # Mean over the parties of every measure of every phase, one row per phase
+  def aggregate_phases(self, id):
+    rows = {}
+    for metrics in self.phase_metrics:
+      for phase, values in metrics["phases"].items():
+        rows.setdefault(phase, []).append(values)
+
+    df = pd.DataFrame([
+      dict(pd.DataFrame(values).mean(), **{"Parameter": str(id), "Phase": phase})
+      for phase, values in rows.items()
+    ])
+    return df
 
   # Reset the evaluation for one parameter
   def complete_results(self, id):
@@ -84,23 +108,29 @@ class PerformanceEvaluator:
     }, name=str(id)))
 
     self.df.to_csv(f"perf_eval/{self.title}.csv")
+
+    if self.phase_metrics:
+      self.phases_df = pd.concat([self.phases_df, self.aggregate_phases(id)], ignore_index=True)
+      self.phases_df.to_csv(f"perf_eval/{self.title} phases.csv", index=False)
     
     self.computation_times = []
     self.bytes_in = []
     self.bytes_out = []
+    self.phase_metrics = []
 
   def plot_results(self):
     make_plot(self.title, f"perf_eval/{self.title}.csv")
 
 
-def smc_client(client_id, prot, value_dict, queue):
+def smc_client(client_id, prot, value_dict, session_id, queue):
     cli = SMCParty(
         client_id,
         "localhost",
         5000,
         protocol_spec=prot,
         value_dict=value_dict,
-        performance_evaluation=True
+        performance_evaluation=True,
+        session_id=session_id
     )
     res = cli.run()
     queue.put(res)
@@ -111,15 +141,29 @@ def smc_server(args):
     run("localhost", 5000, args)
 
 
+# A single server serves all the runs, each run in its own session
+server = None
+run_count = 0
+
+
+def start_server():
+    global server
+    if server is None:
+        server = Process(target=smc_server, args=([],), daemon=True)
+        server.start()
+        wait_for_server("http://localhost:5000")
+
+
 def run_processes(server_args, performance_evaluator, *client_args):
+    global run_count
     queue = Queue()
 
+    start_server()
+    run_count += 1
+    session_id = f"run{run_count}"
+    create_session("localhost", 5000, session_id, server_args)
 
-    server = Process(target=smc_server, args=(server_args,))
-    clients = [Process(target=smc_client, args=(*args, queue)) for args in client_args]
-
-    server.start()
-    time.sleep(3)
+    clients = [Process(target=smc_client, args=(*args, session_id, queue)) for args in client_args]
     for client in clients:
         client.start()
 
@@ -129,16 +173,44 @@ def run_processes(server_args, performance_evaluator, *client_args):
         
     for client in clients:
         res = queue.get()
-        performance_evaluator.performance_eval_callback("", res[1], res[2], res[3])
+        performance_evaluator.performance_eval_callback("", res[1], res[2], res[3], res[4])
         results.append(res[0])
 
-    server.terminate()
-    server.join()
+    delete_session("localhost", 5000, session_id)
+
+    return results
 
-    # To "ensure" the workers are dead.
-    time.sleep(2)
 
-    print("Server stopped.")
+def run_threads(server_args, performance_evaluator, *client_args):
+    """
+    Run all the parties as threads of this process, communicating in memory instead of through
+    the server, so that only the cost of the protocol is measured.
+    """
+    transport = MemoryTransport(server_args)
+    outputs = []
+
+    def client(client_id, prot, value_dict):
+        cli = SMCParty(
+            client_id,
+            None,
+            None,
+            protocol_spec=prot,
+            value_dict=value_dict,
+            performance_evaluation=True,
+            transport=transport
+        )
+        outputs.append(cli.run())
+
+    clients = [threading.Thread(target=client, args=args) for args in client_args]
+    for client_thread in clients:
+        client_thread.start()
+    for client_thread in clients:
+        client_thread.join()
+
+    results = list()
+    for res in outputs:
+        performance_evaluator.performance_eval_callback("", res[1], res[2], res[3], res[4])
+        results.append(res[0])
 
     return results
 
@@ -149,7 +221,8 @@ def suite(parties, expr, expected, performance_evaluator):
     prot = ProtocolSpec(expr=expr, participant_ids=participants)
     clients = [(name, prot, value_dict) for name, value_dict in parties.items()]
 
-    results = run_processes(participants, performance_evaluator, *clients)
+    runner = run_threads if IN_MEMORY else run_processes
+    results = runner(participants, performance_evaluator, *clients)
 
     print(results)
 
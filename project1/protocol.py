@@ -1,3 +1,4 @@
+from circuit import Circuit, compile_expression
 from expression import Expression
 
 
@@ -7,8 +8,17 @@ class ProtocolSpec:
     Attributes:
         participant_ids: List of IDs of the participating clients
         expr: Expression to be computed
+        circuit: Compiled circuit of the expression, compiled on first use
     """
 
     def __init__(self, participant_ids: list, expr: Expression):
         self.participant_ids = participant_ids
         self.expr = expr
+        self._circuit = None
+
+
+    @property
+    def circuit(self) -> Circuit:
+        if self._circuit is None:
+            self._circuit = compile_expression(self.expr)
+        return self._circuit
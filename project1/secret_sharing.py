@@ -2,51 +2,186 @@
 Secret sharing scheme.
 """
 
-from typing import List
-from random import randint
+from typing import List, Union
+from random import randrange
+
+import numpy as np
+
+
+# Prime modulus of the finite field the shares live in (the Mersenne prime 2^61 - 1).
+DEFAULT_MODULUS = 2 ** 61 - 1
+
 
 class Share:
     """
     A secret share in a finite field.
+
+    Attributes:
+        value: element of the field, in [0, modulus)
+        modulus: prime modulus of the field
     """
 
-    def __init__(self, value: str):
-        self.value = value
+    __slots__ = ("value", "modulus")
+
+    def __init__(self, value: int, modulus: int = DEFAULT_MODULUS):
+        self.value = value % modulus
+        self.modulus = modulus
 
     def __repr__(self):
         return f"Share({self.value})"
 
     def __add__(self, other):
-        return Share(str(int(self.value) + int(other.value)))
+        return Share(self.value + other.value, self.modulus)
 
     def __sub__(self, other):
-        return Share(str(int(self.value) - int(other.value)))
+        return Share(self.value - other.value, self.modulus)
 
     def __mul__(self, other):
-        return Share(str(int(self.value) * int(other.value)))
+        # Multiplication by a public integer is allowed as well
+        if isinstance(other, int):
+            return Share(self.value * other, self.modulus)
+        return Share(self.value * other.value, self.modulus)
+
 
+def to_signed(value: int, modulus: int = DEFAULT_MODULUS) -> int:
+    """Map a field element to an integer in ]-modulus/2, modulus/2]."""
+    value %= modulus
+    return value - modulus if value > modulus // 2 else value
 
-def share_secret(secret: int, num_shares: int) -> List[Share]:
+
+def share_secret(secret: int, num_shares: int, modulus: int = DEFAULT_MODULUS) -> List[Share]:
     """Generate secret shares."""
     shares = []
-    for i in range(num_shares - 1):
-        num_to_be_assigned = (num_shares-1) - i # -1 because a share can be 0
-        share_bound = secret - sum(shares) - num_to_be_assigned
-        shares.append(randint(0, share_bound) if share_bound > 0 else 0)
-
-    shares.append(secret - sum(shares))
-    # shuffle shares list for randomness in shares assignment
+    total = 0
+    for _ in range(num_shares - 1):
+        share = randrange(modulus)
+        total += share
+        shares.append(Share(share, modulus))
 
-    return list(map(lambda x: Share(str(x)), shares))
+    shares.append(Share(secret - total, modulus))
+    return shares
 
 
 def reconstruct_secret(shares: List[Share]) -> int:
-    """Reconstruct the secret from shares."""
-    sum = 0
+    """Reconstruct the secret from shares, negative secrets being supported."""
+    modulus = shares[0].modulus
+    total = 0
     for share in shares:
-        sum += int(share.value)
-        
-    return sum
+        total += share.value
+
+    return to_signed(total, modulus)
+
+
+def share_secrets(
+        secrets: Union[List[int], np.ndarray],
+        num_shares: int,
+        modulus: int = DEFAULT_MODULUS) -> np.ndarray:
+    """
+    Generate the shares of a batch of secrets at once.
+
+    The secrets are either a list of integers or a uint64 vector of field elements.
+    Returns a (num_shares, len(secrets)) uint64 matrix, row i holding the shares of party i.
+    The modulus must fit on 63 bits, so that the sum of two field elements does not overflow.
+    """
+    if modulus >= 2 ** 63:
+        raise ValueError("The modulus of vectorized shares must fit on 63 bits")
+
+    field_modulus = np.uint64(modulus)
+    if isinstance(secrets, np.ndarray):
+        values = secrets.astype(np.uint64) % field_modulus
+    else:
+        values = np.array([secret % modulus for secret in secrets], dtype=np.uint64)
+    shares = np.empty((num_shares, len(values)), dtype=np.uint64)
+    shares[:-1] = random_elements((num_shares - 1, len(values)), modulus)
+
+    shares[-1] = (values + field_modulus - sum_rows(shares[:-1], modulus)) % field_modulus
+    return shares
+
+
+def reconstruct_secrets(shares: np.ndarray, modulus: int = DEFAULT_MODULUS) -> List[int]:
+    """
+    Reconstruct a batch of secrets from a (num_shares, num_secrets) matrix of shares.
+    """
+    return [to_signed(int(value), modulus) for value in sum_rows(shares, modulus)]
+
+
+def random_elements(shape, modulus: int = DEFAULT_MODULUS) -> np.ndarray:
+    """
+    Draw a uint64 array of uniformly random field elements.
+    """
+    # A fresh generator is seeded from the OS for every batch, so that forked processes never share a state
+    return np.random.default_rng().integers(0, modulus, size=shape, dtype=np.uint64)
+
+
+def mul_mod(a: np.ndarray, b: np.ndarray, modulus: int = DEFAULT_MODULUS) -> np.ndarray:
+    """
+    Multiply two uint64 arrays of field elements element-wise.
+    The products do not fit on 64 bits, so they are computed on Python integers.
+    """
+    return ((a.astype(object) * b.astype(object)) % modulus).astype(np.uint64)
+
+
+def scale_mod(a: np.ndarray, factor: int, modulus: int = DEFAULT_MODULUS) -> np.ndarray:
+    """
+    Multiply a uint64 array of field elements by a public integer.
+    """
+    return mul_mod(a, np.uint64(factor % modulus), modulus)
+
+
+def add_mod(a: np.ndarray, b: np.ndarray, modulus: int = DEFAULT_MODULUS) -> np.ndarray:
+    """
+    Add two uint64 arrays of field elements element-wise, an array of a single element being
+    added to every element of the other one.
+    """
+    return (a + b) % np.uint64(modulus)
+
+
+def sub_mod(a: np.ndarray, b: np.ndarray, modulus: int = DEFAULT_MODULUS) -> np.ndarray:
+    """
+    Subtract two uint64 arrays of field elements element-wise, with the broadcasting of add_mod.
+    """
+    field_modulus = np.uint64(modulus)
+    return (a + (field_modulus - b)) % field_modulus
+
+
+def dot_mod(a: np.ndarray, b: np.ndarray, modulus: int = DEFAULT_MODULUS) -> Union[int, np.ndarray]:
+    """
+    Dot product of a uint64 vector of field elements of at most 63 bits with a vector, or with
+    the rows of a matrix, of such elements.
+
+    The elements are split into 21-bit limbs, so that the limb products (42 bits) of up to 2^22
+    elements can be summed on 64 bits without overflowing. The dot product is then recombined from
+    the 9 dot products of the limbs. A matrix gives a uint64 vector, a vector an integer.
+    """
+    total = 0
+    for start in range(0, len(a), 2 ** 22):
+        a_limbs = _limbs(a[start:start + 2 ** 22])
+        b_limbs = _limbs(b[start:start + 2 ** 22])
+        for i, a_limb in enumerate(a_limbs):
+            for j, b_limb in enumerate(b_limbs):
+                total = total + (np.dot(a_limb, b_limb).astype(object) << (21 * (i + j)))
+    if b.ndim == 1:
+        return int(total) % modulus
+    if isinstance(total, int):
+        return np.zeros(b.shape[1], dtype=np.uint64)
+    return (total % modulus).astype(np.uint64)
+
+
+def _limbs(values: np.ndarray) -> List[np.ndarray]:
+    mask = np.uint64(2 ** 21 - 1)
+    return [(values >> np.uint64(21 * k)) & mask for k in range(3)]
+
+
+def sum_rows(matrix: np.ndarray, modulus: int = DEFAULT_MODULUS) -> np.ndarray:
+    """
+    Sum the rows of a matrix of field elements, reducing after each addition to avoid overflows.
+    """
+    field_modulus = np.uint64(modulus)
+    total = np.zeros(matrix.shape[1], dtype=np.uint64)
+    for row in matrix:
+        total += row
+        np.remainder(total, field_modulus, out=total)
+    return total
 
 
 # Feel free to add as many methods as you want.
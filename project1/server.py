@@ -3,110 +3,444 @@ Trusted server that should help SMC client to communicate.
 You should not need to change this file.
 """
 
-import collections
+import argparse
+import base64
+import logging
 import sys
+import threading
 from os import environ
-from typing import Dict, List, Optional, Tuple
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Union
 
-from flask import Flask, request, Response, jsonify
+from flask import Flask, abort, request, Response, jsonify
 
+from storage import ChannelStore, StoreFullError
 from ttp import TrustedParamGenerator
+from wire import (
+    BINARY_CONTENT_TYPE,
+    JSON_CONTENT_TYPE,
+    pack_elements,
+    pack_frames,
+    unpack_frames,
+)
 
 
 environ["WERKZEUG_RUN_MAIN"] = "true"
 app: Flask = Flask("Trusted Third Party Server")
-store: Dict[str, Dict[Tuple[str, str], bytes]] = collections.defaultdict(dict)
-ttp: TrustedParamGenerator = TrustedParamGenerator()
+logger = logging.getLogger("ttp_server")
 
+# Maximum time in seconds a retrieval request can be held waiting for its message (long polling)
+MAX_WAIT = 60.0
 
-@app.route("/private/<sender_id>/<receiver_id>/<label>", methods=["POST"])
-def send_private_message(sender_id: str, receiver_id: str, label: str):
+# Session used by the URLs that do not name a session
+DEFAULT_SESSION = "default"
+
+
+class Session:
+    """
+    A protocol execution, isolated from the others: its participants, messages and Beaver triplets.
+
+    Attributes:
+        store: messages of the session, by pool ("private" or "public")
+        ttp: trusted parameter generator of the session, knowing its participants
+    """
+
+    def __init__(self, participants: List[str], triplets: int = 0):
+        self.store: Dict[str, ChannelStore] = {"private": ChannelStore(), "public": ChannelStore()}
+        self.ttp = TrustedParamGenerator()
+        for participant in participants:
+            self.ttp.add_participant(participant)
+        if triplets > 0:
+            self.ttp.preprocess(triplets)
+
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """
+        Number of entries and resident bytes of every pool of the session.
+        """
+        res = {pool: channels.stats() for pool, channels in self.store.items()}
+        res.update(self.ttp.stats())
+        return res
+
+
+sessions: Dict[str, Session] = {}
+sessions_lock = threading.Lock()
+
+
+def session_route(rule: str, **options) -> Callable:
+    """
+    Register a view both under `rule`, for the default session, and under
+    /sessions/<session_id>`rule`. The view gets the session as a `session` argument.
+    """
+    def decorator(view: Callable) -> Callable:
+        def session_view(session_id: str, **kwargs):
+            return view(session=_session(session_id), **kwargs)
+
+        session_view.__name__ = view.__name__
+        session_view.__doc__ = view.__doc__
+        app.route(rule, defaults={"session_id": DEFAULT_SESSION}, **options)(session_view)
+        app.route("/sessions/<session_id>" + rule, **options)(session_view)
+        return view
+    return decorator
+
+
+@app.route("/sessions/<session_id>", methods=["POST"])
+def create_session(session_id: str):
+    """
+    Create a session. The body is a JSON object with the list of the `participants`, and the
+    number of Beaver `triplets` to pregenerate (optional).
+    """
+    params = request.get_json(force=True)
+    with sessions_lock:
+        if session_id in sessions:
+            return Response(f"Session {session_id} already exists", status=409)
+        sessions[session_id] = Session(params["participants"], params.get("triplets", 0))
+
+    logger.info("[ SESSION  ] CREATE %s", session_id)
+    return Response(status=200)
+
+
+@app.route("/sessions/<session_id>", methods=["DELETE"])
+def delete_session(session_id: str):
+    """
+    Destroy a session, with its messages and triplets.
+    """
+    with sessions_lock:
+        session = sessions.pop(session_id, None)
+    if session is None:
+        return Response(status=404)
+
+    logger.info("[ SESSION  ] DELETE %s", session_id)
+    return Response(status=200)
+
+
+@app.route("/sessions", methods=["GET"])
+def list_sessions():
+    """
+    IDs of the current sessions.
+    """
+    with sessions_lock:
+        return jsonify(sorted(sessions)), 200
+
+
+@session_route("/private/<sender_id>/<receiver_id>/<label>", methods=["POST"])
+def send_private_message(session: Session, sender_id: str, receiver_id: str, label: str):
     """
     The client send a private message to the server.
     """
-    print(
-        f"[ SEND     ] SENDER {sender_id} / LABEL {label} / RECEIVER {receiver_id}"
+    logger.info(
+        "[ SEND     ] SENDER %s / LABEL %s / RECEIVER %s", sender_id, label, receiver_id
     )
-    _set_value("private", (receiver_id, label), request.get_data())
+    # A private message is consumed once its receiver retrieved it
+    _set_value(session, "private", (receiver_id, label), request.get_data(), [receiver_id])
     return Response(status=200)
 
 
-@app.route("/private/<receiver_id>/<label>", methods=["GET"])
-def retrieve_private_message(receiver_id: str, label: str):
+@session_route("/private/<receiver_id>/<label>", methods=["GET"])
+def retrieve_private_message(session: Session, receiver_id: str, label: str):
     """
     The client retrieve a private message from the server.
+    With a `wait` query parameter, the request is held until the message is available.
     """
-    res = _get_value("private", (receiver_id, label))
+    res = _get_value(session, "private", (receiver_id, label), receiver_id, _wait_time())
     if res is not None:
-        print(f"[ RETRIEVE ] RECEIVER {receiver_id} / LABEL {label}")
+        logger.info("[ RETRIEVE ] RECEIVER %s / LABEL %s", receiver_id, label)
         return res, 200
 
     return Response(status=404)
 
 
-@app.route("/public/<sender_id>/<label>", methods=["POST"])
-def publish_message(sender_id: str, label: str):
+@session_route("/private/<sender_id>", methods=["POST"])
+def send_private_messages(session: Session, sender_id: str):
+    """
+    The client send several private messages to the server at once.
+    The body is a JSON list of [receiver_id, label, base64 message], or, with the binary
+    content type, the frames receiver_id, label, message of every message.
+    """
+    if request.mimetype == BINARY_CONTENT_TYPE:
+        frames = unpack_frames(request.get_data())
+        messages = [
+            (receiver_id.decode(), label.decode(), data)
+            for receiver_id, label, data in zip(frames[0::3], frames[1::3], frames[2::3])
+        ]
+    else:
+        messages = [
+            (receiver_id, label, base64.b64decode(message))
+            for receiver_id, label, message in request.get_json(force=True)
+        ]
+
+    for receiver_id, label, data in messages:
+        logger.info(
+            "[ SEND     ] SENDER %s / LABEL %s / RECEIVER %s", sender_id, label, receiver_id
+        )
+        _set_value(session, "private", (receiver_id, label), data, [receiver_id])
+    return Response(status=200)
+
+
+@session_route("/private/<receiver_id>", methods=["GET"])
+def retrieve_private_messages(session: Session, receiver_id: str):
+    """
+    The client retrieve several private messages from the server at once, given
+    comma-separated in the `labels` query parameter. With an `any` query parameter, the request
+    is only held until one of the messages is available.
+    Returns the available messages by label, as a JSON object of base64 messages or as frames.
+    """
+    labels = _list_param("labels")
+    channels = [(receiver_id, label) for label in labels]
+    res = _get_values(session, "private", channels, receiver_id, _wait_time(), "any" in request.args)
+    logger.info("[ RETRIEVE ] RECEIVER %s / %s LABELS", receiver_id, len(res))
+    return _messages_response({label: data for (_, label), data in res.items()})
+
+
+@session_route("/public/<sender_id>/<label>", methods=["POST"])
+def publish_message(session: Session, sender_id: str, label: str):
     """
     The client publish a public message on the server.
     """
-    print(f"[ PUBLISH  ] SENDER {sender_id} / LABEL {label}")
-    _set_value("public", (sender_id, label), request.get_data())
+    logger.info("[ PUBLISH  ] SENDER %s / LABEL %s", sender_id, label)
+    # A public message is consumed once every participant retrieved it
+    _set_value(session, "public", (sender_id, label), request.get_data(), session.ttp.participant_ids)
     return Response(status=200)
 
 
-@app.route("/public/<receiver_id>/<sender_id>/<label>", methods=["GET"])
-def retrieve_public_message(receiver_id: str, sender_id: str, label: str):
+@session_route("/public/<receiver_id>/<sender_id>/<label>", methods=["GET"])
+def retrieve_public_message(session: Session, receiver_id: str, sender_id: str, label: str):
     """
     The client retrieve a public message from the server.
+    With a `wait` query parameter, the request is held until the message is available.
     """
-    res = _get_value("public", (sender_id, label))
+    res = _get_value(session, "public", (sender_id, label), receiver_id, _wait_time())
     if res is not None:
-        print(
-            f"[ RETRIEVE ] RECEIVER {receiver_id}. LABEL {label} / SENDER {sender_id}"
+        logger.info(
+            "[ RETRIEVE ] RECEIVER %s. LABEL %s / SENDER %s", receiver_id, label, sender_id
         )
         return res, 200
     return Response(status=404)
 
 
-@app.route("/shares/<client_id>/<op_id>", methods=["GET"])
-def retrieve_share(client_id: str, op_id: str):
+@session_route("/public/<receiver_id>/<label>", methods=["GET"])
+def retrieve_public_messages(session: Session, receiver_id: str, label: str):
+    """
+    The client retrieve the public messages of several senders under a same label at once,
+    the senders being given comma-separated in the `senders` query parameter.
+    Returns the available messages by sender, as a JSON object of base64 messages or as frames.
+    """
+    senders = _list_param("senders")
+    res = _get_values(session, "public", [(sender_id, label) for sender_id in senders], receiver_id, _wait_time())
+    logger.info("[ RETRIEVE ] RECEIVER %s. LABEL %s / %s SENDERS", receiver_id, label, len(res))
+    return _messages_response({sender_id: data for (sender_id, _), data in res.items()})
+
+
+@session_route("/shares/<client_id>/<op_id>", methods=["GET"])
+def retrieve_share(session: Session, client_id: str, op_id: str):
     """
     The client retrieve Beaver triplets generated by the server.
     """
-    shares = ttp.retrieve_share(client_id, op_id)
-    return jsonify([share.value for share in shares]), 200
+    shares = session.ttp.retrieve_share(client_id, op_id)
+    return _elements_response([share.value for share in shares])
+
+
+@session_route("/shares/<client_id>", methods=["POST"])
+def retrieve_shares(session: Session, client_id: str):
+    """
+    The client retrieve the Beaver triplets of several operations at once.
+    The operation IDs are sent comma-separated in the body. In binary, the response holds the
+    shares of a, b and c of every operation in turn.
+    """
+    op_ids = request.get_data().decode().split(",")
+    triplets = session.ttp.retrieve_shares(client_id, op_ids)
+    if not _accepts_binary():
+        return jsonify([[share.value for share in shares] for shares in triplets]), 200
+    return _elements_response([share.value for shares in triplets for share in shares])
+
+
+@session_route("/seeds/<client_id>", methods=["GET"])
+def retrieve_seed(session: Session, client_id: str):
+    """
+    The client retrieve the seed of its seeded Beaver triplets, as raw bytes.
+    """
+    return Response(session.ttp.retrieve_seed(client_id), status=200, content_type="application/octet-stream")
+
+
+@session_route("/corrections/<client_id>", methods=["POST"])
+def retrieve_corrections(session: Session, client_id: str):
+    """
+    The client retrieve the nonce of the seeded Beaver triplets of several operations, with the
+    corrections of its shares of c. The operation IDs are sent comma-separated in the body. In
+    binary, the response holds the nonce and the corrections in two frames.
+    """
+    op_ids = request.get_data().decode().split(",")
+    nonce, corrections = session.ttp.retrieve_corrections(client_id, op_ids)
+    if not _accepts_binary():
+        return jsonify({"nonce": _encode(nonce), "corrections": corrections.tolist()}), 200
+    return Response(pack_frames([nonce, pack_elements(corrections)]), status=200, content_type=BINARY_CONTENT_TYPE)
+
+
+@session_route("/store", methods=["DELETE"])
+def clear_store(session: Session):
+    """
+    Tear down a protocol execution of the session: drop every message and every assigned triplet.
+    """
+    for pool in session.store.values():
+        pool.clear()
+    session.ttp.reset()
+    return Response(status=200)
 
 
-def _set_value(pool: str, channel: Tuple[str, str], data: bytes) -> None:
+@session_route("/stats", methods=["GET"])
+def stats(session: Session):
+    """
+    Number of entries and resident bytes of every pool of the session.
+    """
+    return jsonify(session.stats()), 200
+
+
+@app.errorhandler(StoreFullError)
+def store_full(error: StoreFullError):
+    """
+    Refuse a message that does not fit in its pool, rather than dropping messages still awaited.
+    """
+    logger.warning("[ REFUSE   ] %s", error)
+    return Response(str(error), status=507)
+
+
+def _session(session_id: str) -> Session:
+    """
+    Get a session, aborting the request if it does not exist.
+    """
+    session = sessions.get(session_id)
+    if session is None:
+        # Not a 404, which means that a message is not available yet
+        abort(400, f"Unknown session {session_id}")
+    return session
+
+
+def _set_value(
+        session: Session,
+        pool: str,
+        channel: Tuple[str, str],
+        data: bytes,
+        readers: Optional[Iterable[str]] = None) -> None:
     """
     Push data to a channel in a given pool and send an event.
+    The data is evicted once all the readers retrieved it.
+    """
+    session.store[pool].set(channel, data, readers)
+
+
+def _get_value(
+        session: Session,
+        pool: str,
+        channel: Tuple[str, str],
+        reader: Optional[str] = None,
+        timeout: float = 0) -> Optional[bytes]:
+    """
+    Subscribe to a channel in a given pool and get it once ready, waiting up to `timeout` seconds.
     """
-    store[pool][channel] = data
+    return session.store[pool].get(channel, reader, timeout)
 
 
-def _get_value(pool: str, channel: Tuple[str, str]) -> Optional[bytes]:
+def _get_values(
+        session: Session,
+        pool: str,
+        channels: List[Tuple[str, str]],
+        reader: Optional[str] = None,
+        timeout: float = 0,
+        wait_any: bool = False) -> Dict[Tuple[str, str], bytes]:
     """
-    Subscribe to a channel in a given pool and get it once ready.
+    Get the data available on several channels of a given pool, waiting up to `timeout` seconds
+    for all of them (or any of them, with `wait_any`) to be ready.
     """
-    if channel not in store[pool]:
-        return None
-    return store[pool][channel]
+    return session.store[pool].get_many(channels, reader, timeout, wait_any)
 
 
-def run(host: str, port: int, participants: List[str]) -> None:
+def _list_param(name: str) -> List[str]:
     """
-    Register the participants, then run the server.
+    Comma-separated list given in a query parameter.
     """
-    for participant in participants:
-        ttp.add_participant(participant)
-    app.run(host, port, threaded=False, processes=1)
+    value = request.args.get(name, "")
+    return value.split(",") if value else []
+
+
+def _encode(data: bytes) -> str:
+    """
+    Encode data to be embedded in a JSON response.
+    """
+    return base64.b64encode(data).decode("ASCII")
+
+
+def _accepts_binary() -> bool:
+    """
+    Whether the client asked for binary responses, JSON being the default.
+    """
+    return request.accept_mimetypes.best_match([JSON_CONTENT_TYPE, BINARY_CONTENT_TYPE]) == BINARY_CONTENT_TYPE
+
+
+def _messages_response(messages: Dict[str, bytes]):
+    """
+    Response holding messages by key, as frames alternating keys and messages if the client
+    accepts them, as a JSON object of base64 messages otherwise.
+    """
+    if not _accepts_binary():
+        return jsonify({key: _encode(data) for key, data in messages.items()}), 200
+    frames = [frame for key, data in messages.items() for frame in (key, data)]
+    return Response(pack_frames(frames), status=200, content_type=BINARY_CONTENT_TYPE)
+
+
+def _elements_response(values: List[int]):
+    """
+    Response holding field elements, in binary if the client accepts it, as a JSON list otherwise.
+    """
+    if not _accepts_binary():
+        return jsonify(values), 200
+    return Response(pack_elements(values), status=200, content_type=BINARY_CONTENT_TYPE)
+
+
+def _wait_time() -> float:
+    """
+    Time a retrieval request asks to be held, from its `wait` query parameter.
+    """
+    try:
+        return min(max(float(request.args.get("wait", 0)), 0), MAX_WAIT)
+    except ValueError:
+        return 0
+
+
+def run(
+        host: str,
+        port: int,
+        participants: List[str],
+        triplets: int = 0,
+        log_level: Union[int, str] = logging.INFO) -> None:
+    """
+    Create the default session with the participants, start generating its `triplets` Beaver
+    triplets in the background, then run the server. Requests are served by separate threads, so
+    that long polling requests do not hold the others. Other sessions can be created through the
+    /sessions/<session_id> endpoint.
+
+    Every request is logged at the INFO level: a higher `log_level` (e.g. "WARNING") disables
+    request logging, which is recommended under load.
+    """
+    logging.basicConfig(format="%(message)s")
+    logger.setLevel(log_level)
+    logging.getLogger("werkzeug").setLevel(log_level)
+
+    sessions[DEFAULT_SESSION] = Session(participants, triplets)
+    app.run(host, port, threaded=True, processes=1)
 
 
 def main(args: List[str]) -> None:
     """
     Entrypoint of the program.
     """
-    run("localhost", 5000, args)
+    parser = argparse.ArgumentParser(description="Trusted server of the SMC parties.")
+    parser.add_argument("participants", nargs="*", help="IDs of the participants")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument("--triplets", type=int, default=0, help="number of Beaver triplets to pregenerate")
+    parser.add_argument("--log-level", default="INFO", help="DEBUG, INFO, WARNING or ERROR")
+    parsed = parser.parse_args(args)
+
+    run(parsed.host, parsed.port, parsed.participants, parsed.triplets, parsed.log_level.upper())
 
 
 if __name__ == "__main__":
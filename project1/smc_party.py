@@ -5,46 +5,82 @@ MODIFY THIS FILE.
 """
 # You might want to import more classes if needed.
 
-import sys
+import asyncio
 import collections
-import json
 import time
-from server import publish_message, retrieve_private_message, send_private_message
+
+import numpy as np
 from typing import (
     Dict,
-    Set,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
     Tuple,
     Union
 )
 
-from communication import Communication
-from expression import (
-    Expression,
-    Secret,
-    AddOp, SubOp, MultOp, Scalar
+from circuit import (
+    OP_INPUT, OP_CONST,
+    OP_ADD, OP_SUB,
+    OP_ADD_CONST, OP_RSUB_CONST, OP_MUL_CONST,
+    OP_MUL, OP_LINEAR,
+    LinearCombination,
 )
+from communication import AsyncCommunication, Communication, Transport
+from expression import Secret
 from protocol import ProtocolSpec
+from ttp import expand_triplets
 from secret_sharing import (
-    reconstruct_secret,
-    share_secret,
-    Share,
+    DEFAULT_MODULUS,
+    add_mod,
+    dot_mod,
+    mul_mod,
+    reconstruct_secrets,
+    scale_mod,
+    share_secrets,
+    sub_mod,
+    sum_rows,
 )
+from wire import pack_elements, unpack_elements
 
 
 # Feel free to add as many imports as you want.
 
+# Number of terms from which linear combinations are computed as vectorized dot products
+LINEAR_VECTOR_SIZE = 64
+
+# Own share of a value, as a uint64 vector of field elements: a single element for a scalar
+# value, one element per record for a vector value
+ShareVector = np.ndarray
+
 
 class SMCParty:
     """
     A client that executes an SMC protocol to collectively compute a value of an expression together
     with other clients.
 
+    In vector mode, secrets hold arrays of values of a same length, and the expression is computed
+    element-wise over them in a single run, scalars and scalar secrets applying to every element:
+    >>> party = SMCParty("Alice", "localhost", 5000, prot, {alice_secret: [3, 1, 4]})
+    >>> party.run()  # [x * y for x, y in zip([3, 1, 4], bob_values)]
+    The multiplications of a round are then performed for every element at once.
+
     Attributes:
         client_id: Identifier of this client
         server_host: hostname of the server
         server_port: port of the server
         protocol_spec (ProtocolSpec): Protocol specification
-        value_dict (dict): Dictionary assigning values to secrets belonging to this client.
+        value_dict (dict): Dictionary assigning values to secrets belonging to this client. A value
+            is either an integer, or a sequence of integers in vector mode
+        layered (bool): Open all the multiplications of a same multiplicative depth in one round (default: True)
+        seeded_triplets (bool): Expand own shares of the Beaver triplets from a seed shared with the
+            trusted parameter generator, which only sends the corrections of c (default: False)
+        session_id: session of the server the protocol runs in, None for the default session
+        transport: transport to use instead of the server, e.g. a MemoryTransport shared by clients
+            running in the same process (default: None)
+        round_metrics (bool): Record every multiplication round as a phase of its own, rather than
+            all of them in a single "multiplication rounds" phase (default: False)
     """
 
     def __init__(
@@ -53,49 +89,79 @@ class SMCParty:
             server_host: str,
             server_port: int,
             protocol_spec: ProtocolSpec,
-            value_dict: Dict[Secret, int],
-            performance_evaluation: bool = False
+            value_dict: Dict[Secret, Union[int, Sequence[int]]],
+            performance_evaluation: bool = False,
+            layered: bool = True,
+            seeded_triplets: bool = False,
+            session_id: Optional[str] = None,
+            transport: Optional[Transport] = None,
+            round_metrics: bool = False
     ):
-        self.comm = Communication(server_host, server_port, client_id)
+        self.comm = Communication(server_host, server_port, client_id, session_id=session_id, transport=transport)
 
         self.client_id = client_id
         self.protocol_spec = protocol_spec
         self.value_dict = value_dict
         self.secret_ids_dict = {}  # Associate secrets sharer with corresponding secrets IDs; ex: {"Alice":alice's secrets' IDs}
         self.secret_ids = []
-        self.shares_dict = {}
+        self.secret_widths: Dict[str, int] = {}  # Number of elements of each vector secret, by ID
+        self.shares_dict: Dict[str, ShareVector] = {}
+        self.widths: List[int] = []  # Number of elements of the value of each slot of the circuit
         self.performance_evaluation = performance_evaluation
+        self.layered = layered
+        self.seeded_triplets = seeded_triplets
+        self.triplets: Dict[str, Tuple[ShareVector, ShareVector, ShareVector]] = {}  # Beaver triplet shares, by operation ID
+        self.metrics = self.comm.metrics  # Time, requests and wire bytes of every phase of the run
+        self.round_metrics = round_metrics
+
 
-        self.bytes_in = 0
-        self.bytes_out = 0
+    # Bytes received and sent on the wire during the whole run
+    @property
+    def bytes_in(self) -> int:
+        return self.metrics.total()["bytes_in"]
 
+    @property
+    def bytes_out(self) -> int:
+        return self.metrics.total()["bytes_out"]
 
     ### OVERRRIDES
-    # Every communication function is overriden to help for performance evaluation
-    def publish_message(self, label: str, msg: str):
-        self.bytes_out += len(msg.encode())
+    # Every communication function goes through self.comm, which records the requests and the wire
+    # bytes into the current phase of self.metrics
+    def publish_message(self, label: str, msg: Union[bytes, str]):
         self.comm.publish_message(label, msg)
 
-    def send_private_message(self, receiver, label: str, msg: str):
-        self.bytes_out += len(msg.encode())
+    def send_private_message(self, receiver, label: str, msg: Union[bytes, str]):
         self.comm.send_private_message(receiver, label, msg)
 
-    def retrieve_public_message(self, sender_id: str, label: str) -> str:
-        res = self.comm.retrieve_public_message(sender_id, label)
-        self.bytes_in += len(res)
-        return res.decode()
+    def retrieve_public_message(self, sender_id: str, label: str) -> bytes:
+        return self.comm.retrieve_public_message(sender_id, label)
+
+    def retrieve_private_message(self, label: str) -> bytes:
+        return self.comm.retrieve_private_message(label)
 
-    def retrieve_private_message(self, label: str) -> str:
-        res = self.comm.retrieve_private_message(label)
-        self.bytes_in += len(res)
-        return res.decode()
+    def send_private_messages(self, messages: List[Tuple[str, str, Union[bytes, str]]]):
+        self.comm.send_private_messages(messages)
+
+    def retrieve_public_messages(self, sender_ids: List[str], label: str) -> List[bytes]:
+        return self.comm.retrieve_public_messages(sender_ids, label)
+
+    def retrieve_private_messages(self, labels: List[str]) -> List[bytes]:
+        return self.comm.retrieve_private_messages(labels)
+
+    def retrieve_available_private_messages(self, labels: List[str]) -> Dict[str, bytes]:
+        return self.comm.retrieve_available_private_messages(labels)
 
     def retrieve_beaver_triplet_shares(self, id: str):
-        res = self.comm.retrieve_beaver_triplet_shares(id)
-        for x in res:
-            print("Adding this", sys.getsizeof(x))
-            self.bytes_in += sys.getsizeof(x)
-        return res
+        return self.comm.retrieve_beaver_triplet_shares(id)
+
+    def retrieve_beaver_triplet_shares_batch(self, ids: List[str]):
+        return self.comm.retrieve_beaver_triplet_shares_batch(ids)
+
+    def retrieve_triplet_seed(self) -> bytes:
+        return self.comm.retrieve_triplet_seed()
+
+    def retrieve_triplet_corrections(self, ids: List[str]) -> Tuple[bytes, np.ndarray]:
+        return self.comm.retrieve_triplet_corrections(ids)
 
     ### \OVERRIDES
 
@@ -105,42 +171,108 @@ class SMCParty:
         """
 
         start = time.time()
+        participant_ids = self.protocol_spec.participant_ids
 
         # broadcast and get secrets ids from clients
-        self.publish_message(f"client_secrets_id", ",".join([x.id.decode() for x in self.value_dict.keys()]))
-
-        for sid in self.protocol_spec.participant_ids:
-            self.secret_ids_dict[sid] = self.retrieve_public_message(sid, "client_secrets_id").split(",")
-            for id in self.secret_ids_dict[sid]:
+        with self.metrics.phase("id exchange"):
+            self.publish_message("client_secrets_id", self.secret_ids_message())
+            self.set_secret_ids(self.retrieve_public_messages(participant_ids, "client_secrets_id"))
+
+        # broadcast own secret's shares to clients, all the secrets being shared at once
+        with self.metrics.phase("share distribution"):
+            self.send_private_messages(self.share_messages())
+
+        # compute self's result share, while receiving own share of each secret, and broadcast it
+        my_share = self.process_circuit_streaming()
+        with self.metrics.phase("result opening"):
+            self.publish_message("computed share", pack_elements(my_share))
+            reconstructed = self.reconstruct_result(self.retrieve_public_messages(participant_ids, "computed share"))
+
+        return self.result(reconstructed, time.time() - start)
+
+
+    # Message announcing the IDs of own secrets, the IDs of vector secrets being followed by their width
+    def secret_ids_message(self) -> str:
+        return ",".join([
+            x.id.decode() if np.ndim(value) == 0 else f"{x.id.decode()}:{len(value)}"
+            for x, value in self.value_dict.items()
+        ])
+
+    # Record the IDs and widths of the secrets of every client, from their announcements
+    def set_secret_ids(self, messages: List[bytes]) -> None:
+        for sid, ids in zip(self.protocol_spec.participant_ids, messages):
+            self.secret_ids_dict[sid] = []
+            for entry in ids.decode().split(","):
+                if not entry:
+                    continue
+                id, _, width = entry.partition(":")
+                if width:
+                    self.secret_widths[id] = int(width)
+                self.secret_ids_dict[sid].append(id)
                 self.secret_ids.append(id)
-
-        # broadcast own secret's shares to clients
-        for secret in self.value_dict.keys():
-            shares = share_secret(self.value_dict[secret], len(self.protocol_spec.participant_ids))
-            for idx, sid in enumerate(self.protocol_spec.participant_ids):
-                self.send_private_message(sid, secret.id.decode(), shares[idx].value)
-
-        # retrieve own share for each secret
-        for sid in self.protocol_spec.participant_ids:
-            for secret_id in self.secret_ids_dict[sid]:
-                self.shares_dict[secret_id] = Share(self.retrieve_private_message(secret_id))
-
-        # compute and broadcast self's result share
-        expression = self.protocol_spec.expr
-        my_share = self.process_expression(expression)
-        self.publish_message("computed share", str(my_share.value))
-        shares = []
-        for sid in self.protocol_spec.participant_ids:
-            shares.append(Share(self.retrieve_public_message(sid, "computed share")))
-
-        reconstructed = reconstruct_secret(shares)
-
-        end = time.time()
+        declared = set(self.secret_widths.values())
+        if len(declared) > 1:
+            raise ValueError(f"Vector secrets of different widths are declared: {sorted(declared)}")
+        self.widths = self.slot_widths()
+
+    # Number of elements of the value of each slot: the width of its secret for an input, 1 for a
+    # constant, and the width of its widest operand otherwise, operands of width 1 being broadcast
+    def slot_widths(self) -> List[int]:
+        circuit = self.protocol_spec.circuit
+        widths = [1] * len(circuit)
+        for i in range(len(circuit)):
+            if circuit.ops[i] == OP_INPUT:
+                widths[i] = self.secret_widths.get(circuit.labels[i], 1)
+                continue
+            operands = {widths[slot] for slot in circuit.operands(i)} - {1}
+            if len(operands) > 1:
+                raise ValueError(f"Vector secrets of different widths are combined: {sorted(operands)}")
+            widths[i] = operands.pop() if operands else 1
+        return widths
+
+    # Private messages giving every client its share of each own secret, the elements of all the
+    # secrets being shared at once
+    def share_messages(self) -> List[Tuple[str, str, bytes]]:
+        participant_ids = self.protocol_spec.participant_ids
+        secrets = list(self.value_dict.keys())
+        elements = [
+            [int(value)] if np.ndim(value) == 0 else [int(element) for element in value]
+            for value in self.value_dict.values()
+        ]
+        shares = share_secrets([element for values in elements for element in values], len(participant_ids))
+        offsets = np.cumsum([len(values) for values in elements])[:-1]
+        return [
+            (sid, secret.id.decode(), pack_elements(share))
+            for idx, sid in enumerate(participant_ids)
+            for secret, share in zip(secrets, np.split(shares[idx], offsets))
+        ]
+
+    # Record own share of every secret, in the order of self.secret_ids
+    def set_shares(self, messages: List[bytes]) -> None:
+        for secret_id, share in zip(self.secret_ids, messages):
+            self.shares_dict[secret_id] = unpack_elements(share)
+
+    # Reconstruct the result from the result shares of every client: a list of the values of
+    # every element in vector mode, an integer otherwise. The result has the declared width of the
+    # vector secrets, even when the expression no longer reads them once folded (e.g. v * Scalar(0))
+    def reconstruct_result(self, messages: List[bytes]) -> Union[int, List[int]]:
+        values = reconstruct_secrets(np.stack([unpack_elements(share) for share in messages]))
+        if not self.secret_widths:
+            return values[0]
+        width = next(iter(self.secret_widths.values()))
+        return values if len(values) == width else values * width
+
+    # Value returned by run. In performance evaluation, the measures of the run are returned as well,
+    # the last one being the per-phase metrics, as a JSON-serializable dictionary
+    def result(self, reconstructed: int, duration: float):
         if self.performance_evaluation:
-            return (reconstructed, end - start, self.bytes_in, self.bytes_out)
+            return (reconstructed, duration, self.bytes_in, self.bytes_out, self.metrics.to_dict())
         else:
             return reconstructed
 
+    # Per-phase metrics of the run, in JSON
+    def metrics_json(self) -> str:
+        return self.metrics.to_json()
 
     # Retrieve own's share of a given secret
     def get_share(self, x: Secret):
@@ -150,78 +282,302 @@ class SMCParty:
     def get_self_id(self) -> int:
         return self.protocol_spec.participant_ids.index(self.client_id)
 
-    # Perform a + or - operation on shares 
-    def perform_operation(self, expr: Expression, a: Share, b: Share) -> Share:
-        if isinstance(expr, AddOp): 
-            return a + b
-        elif isinstance(expr, SubOp):
-            return a - b
-        elif isinstance(expr, MultOp):
-            return a * b
-
-    # Perform a multiplication between two secrets
-    def perform_secret_multiplication(self, expr: Expression, a: Share, b: Share):
-        # Compute beaver triplets
-        a_i, b_i, c_i = tuple(map(lambda x: Share(str(x)), self.retrieve_beaver_triplet_shares(expr.id.decode())))
-        x_share = a - a_i
-        y_share = b - b_i
-
-        self.publish_message("castor_x", str(x_share.value));
-        self.publish_message("castor_y", str(y_share.value));
-
-        # Reconstruct [x - a] and [y - b]
-        x_shares = [] 
-        y_shares = []
-        for sid in self.protocol_spec.participant_ids:
-            x_shares.append(Share(self.retrieve_public_message(sid, "castor_x")))
-            y_shares.append(Share(self.retrieve_public_message(sid, "castor_y")))
-
-        x = Share(str(reconstruct_secret(x_shares)))
-        y = Share(str(reconstruct_secret(y_shares)))
+    # Turn a public value into a share: only the first party holds the value, others hold 0
+    def to_share(self, value: int) -> ShareVector:
+        return np.array([value % DEFAULT_MODULUS if self.get_self_id() == 0 else 0], dtype=np.uint64)
+
+    # Group the multiplications between secrets in rounds of slots, each round being opened at once.
+    # In layered mode, a round holds every multiplication of a given multiplicative depth,
+    # otherwise every multiplication gets its own round.
+    def multiplication_rounds(self) -> List[List[int]]:
+        rounds = [list(range(start, end)) for start, end in self.protocol_spec.circuit.rounds()]
+        if self.layered:
+            return rounds
+        return [[slot] for slots in rounds for slot in slots]
+
+    # Slots of the multiplications between secrets
+    def multiplication_slots(self) -> List[int]:
+        circuit = self.protocol_spec.circuit
+        return [i for i in range(len(circuit)) if circuit.ops[i] == OP_MUL]
+
+    # IDs of the Beaver triplets needed by the multiplications between secrets: the ID of the
+    # operation, or one ID per element of a vector operation
+    def multiplication_ids(self) -> List[str]:
+        circuit = self.protocol_spec.circuit
+        ids = []
+        for slot in self.multiplication_slots():
+            if self.widths[slot] == 1:
+                ids.append(circuit.labels[slot])
+            else:
+                ids.extend(f"{circuit.labels[slot]}.{k}" for k in range(self.widths[slot]))
+        return ids
+
+    # Record the Beaver triplet shares of every multiplication, given in the order of multiplication_ids
+    def set_triplets(self, triplets: Union[List[Tuple[int, int, int]], np.ndarray]) -> None:
+        circuit = self.protocol_spec.circuit
+        matrix = np.array(triplets, dtype=np.uint64).reshape(-1, 3)
+        offset = 0
+        for slot in self.multiplication_slots():
+            a, b, c = matrix[offset:offset + self.widths[slot]].T
+            self.triplets[circuit.labels[slot]] = (a, b, c)
+            offset += self.widths[slot]
+
+    # Record the Beaver triplet shares of every multiplication, expanded from own seed, the
+    # shares of c being replaced by their corrections if any
+    def set_seeded_triplets(self, seed: bytes, nonce: bytes, corrections: np.ndarray) -> None:
+        shares = expand_triplets(seed, nonce, len(self.multiplication_ids()))
+        if len(corrections):
+            shares[2] = corrections
+        self.set_triplets(shares.T)
+
+    # Fetch the Beaver triplets of every multiplication at once
+    def retrieve_triplets(self) -> None:
+        op_ids = self.multiplication_ids()
+        if op_ids:
+            with self.metrics.phase("triplet retrieval"):
+                if self.seeded_triplets:
+                    self.set_seeded_triplets(self.retrieve_triplet_seed(), *self.retrieve_triplet_corrections(op_ids))
+                else:
+                    self.set_triplets(self.retrieve_beaver_triplet_shares_batch(op_ids))
+
+    # Perform every multiplication of a round with the Beaver triplet scheme, opening all the
+    # masked values [x - a] and [y - b] of the round with a single broadcast
+    def round_phase(self, round_idx: int) -> str:
+        """
+        Name of the phase the multiplication round `round_idx` is recorded in.
+        """
+        return f"multiplication round {round_idx}" if self.round_metrics else "multiplication rounds"
+
+    def perform_secret_multiplications(self, round_idx: int, slots: List[int], values: List[ShareVector]) -> None:
+        with self.metrics.phase(self.round_phase(round_idx)):
+            self.publish_message(f"castor_{round_idx}", self.mask_operands(slots, values))
+            messages = self.retrieve_public_messages(self.protocol_spec.participant_ids, f"castor_{round_idx}")
+            self.unmask_products(slots, values, messages)
+
+    # Operands of every element of the multiplications of a round, operands of width 1 being
+    # broadcast, concatenated into one vector per operand
+    def round_operands(self, slots: List[int], values: List[ShareVector]) -> Tuple[ShareVector, ShareVector]:
+        circuit = self.protocol_spec.circuit
+        x = np.concatenate([np.broadcast_to(values[circuit.arg_a[slot]], self.widths[slot]) for slot in slots])
+        y = np.concatenate([np.broadcast_to(values[circuit.arg_b[slot]], self.widths[slot]) for slot in slots])
+        return x, y
+
+    # Shares of the triplets of the multiplications of a round, concatenated into one vector per share
+    def round_triplets(self, slots: List[int]) -> List[ShareVector]:
+        triplets = [self.triplets[self.protocol_spec.circuit.labels[slot]] for slot in slots]
+        return [np.concatenate(shares) for shares in zip(*triplets)]
+
+    # Message holding own shares of the masked values [x - a] and [y - b] of every element of a round
+    def mask_operands(self, slots: List[int], values: List[ShareVector]) -> bytes:
+        x, y = self.round_operands(slots, values)
+        a, b, _ = self.round_triplets(slots)
+        return pack_elements(np.concatenate([sub_mod(x, a), sub_mod(y, b)]))
+
+    # Compute own share of every product of a round, from the masked values broadcast by every
+    # client, for all the elements at once
+    def unmask_products(self, slots: List[int], values: List[ShareVector], messages: List[bytes]) -> None:
+        x_shares, y_shares = self.round_operands(slots, values)
+        _, _, c = self.round_triplets(slots)
+
+        # Reconstruct every [x - a] and [y - b] of the round at once
+        opened = sum_rows(np.stack([unpack_elements(msg) for msg in messages]))
+        x, y = np.split(opened, 2)
 
         # Compute share result
-        res = c_i + a * y + b * x
+        res = add_mod(add_mod(c, mul_mod(x_shares, y)), mul_mod(y_shares, x))
         if self.get_self_id() == 0:
-            res -= x * y
+            res = sub_mod(res, mul_mod(x, y))
+
+        offsets = np.cumsum([self.widths[slot] for slot in slots])[:-1]
+        for slot, share in zip(slots, np.split(res, offsets)):
+            values[slot] = share
+
+    # Evaluate the compiled circuit instruction by instruction, into `values`.
+    # Each round of multiplications between secrets is yielded as it is reached, and must be
+    # performed by the caller before the evaluation is resumed.
+    def evaluate_circuit(self, values: List[Optional[ShareVector]]) -> Iterator[Tuple[int, List[int]]]:
+        circuit = self.protocol_spec.circuit
+        rounds = iter(self.multiplication_rounds())
+        round_idx = 0
+
+        for i in range(len(circuit)):
+            op = circuit.ops[i]
+            if op == OP_INPUT:
+                values[i] = self.shares_dict[circuit.labels[i]]
+            elif op != OP_MUL:
+                values[i] = self.evaluate_instruction(i, values)
+            elif values[i] is None:
+                yield round_idx, next(rounds)
+                round_idx += 1
+
+    # Compute own share of a local instruction (neither an input nor a multiplication between secrets)
+    def evaluate_instruction(self, i: int, values: List[Optional[ShareVector]]) -> ShareVector:
+        circuit = self.protocol_spec.circuit
+        op, a, b = circuit.ops[i], circuit.arg_a[i], circuit.arg_b[i]
+        if op == OP_LINEAR:
+            return self.evaluate_linear(circuit.combinations[a], values)
+        elif op == OP_ADD:
+            return add_mod(values[a], values[b])
+        elif op == OP_SUB:
+            return sub_mod(values[a], values[b])
+        elif op == OP_ADD_CONST:
+            return add_mod(values[a], self.to_share(b))
+        elif op == OP_RSUB_CONST:
+            return sub_mod(self.to_share(a), values[b])
+        elif op == OP_MUL_CONST:
+            return scale_mod(values[a], b)
+        elif op == OP_CONST:
+            return self.to_share(a)
+        raise ValueError(f"Instruction {i} is not local")
+
+    # Compute own share of a linear combination in one pass, as a vectorized dot product when it is
+    # large or over vectors
+    def evaluate_linear(self, combination: LinearCombination, values: List[Optional[ShareVector]]) -> ShareVector:
+        modulus = DEFAULT_MODULUS
+        width = max(self.widths[slot] for slot in combination.slots)
+        if width == 1 and len(combination.slots) < LINEAR_VECTOR_SIZE:
+            total = sum(coef * int(values[slot][0]) for slot, coef in zip(combination.slots, combination.coefficients))
+            res = np.array([total % modulus], dtype=np.uint64)
+        else:
+            shares = np.stack([np.broadcast_to(values[slot], width) for slot in combination.slots])
+            res = dot_mod(combination.coefficient_vector(modulus), shares, modulus)
+        return add_mod(res, self.to_share(combination.constant))
+
+    # Evaluate the compiled circuit as a dataflow, while own shares of the secrets are still being
+    # received: every instruction is computed as soon as its operands are, and every round of
+    # multiplications is performed as soon as all its operands are computed, so that the
+    # distribution of the shares overlaps with the computation.
+    def process_circuit_streaming(self) -> ShareVector:
+        circuit = self.protocol_spec.circuit
+        self.retrieve_triplets()
+
+        values: List[Optional[ShareVector]] = [None] * len(circuit)
+        consumers = circuit.consumers()
+        # Number of operands of each instruction that are not computed yet
+        missing = [len(set(circuit.operands(i))) for i in range(len(circuit))]
+        inputs: Dict[str, List[int]] = collections.defaultdict(list)
+        for i in range(len(circuit)):
+            if circuit.ops[i] == OP_INPUT:
+                inputs[circuit.labels[i]].append(i)
+
+        rounds = self.multiplication_rounds()
+        next_round = 0
+        ready = [i for i in range(len(circuit)) if circuit.ops[i] == OP_CONST]
+
+        def computed(slot: int) -> None:
+            for i in consumers[slot]:
+                missing[i] -= 1
+                if missing[i] == 0 and circuit.ops[i] != OP_MUL:
+                    ready.append(i)
+
+        pending = list(dict.fromkeys(self.secret_ids))
+        with self.metrics.phase("evaluation"):
+            while True:
+                while ready:
+                    i = ready.pop()
+                    values[i] = self.evaluate_instruction(i, values)
+                    computed(i)
+
+                if next_round < len(rounds) and all(missing[slot] == 0 for slot in rounds[next_round]):
+                    self.perform_secret_multiplications(next_round, rounds[next_round], values)
+                    for slot in rounds[next_round]:
+                        computed(slot)
+                    next_round += 1
+                    continue
+
+                if not pending:
+                    break
+                with self.metrics.phase("share distribution"):
+                    messages = self.retrieve_available_private_messages(pending)
+                for label, message in messages.items():
+                    share = unpack_elements(message)
+                    self.shares_dict[label] = share
+                    for i in inputs.get(label, []):
+                        values[i] = share
+                        computed(i)
+                pending = [label for label in pending if label not in messages]
+
+        return values[circuit.output]
+
+
+class AsyncSMCParty(SMCParty):
+    """
+    An SMC client running on asyncio: within each phase of the protocol, the retrievals of the
+    messages of every client are issued concurrently and awaited together, so that a phase lasts
+    as long as the slowest client instead of the sum over all clients.
 
-        return res
+    Attributes: see SMCParty.
+    """
 
-    # Suggestion: To process expressions, make use of the *visitor pattern* like so:
-    # ADD_SCALAR is a flag used to remember if we are adding a scalar
-    def process_expression(
-            self,
-            expr: Expression,
-            ADD_SCALAR=False) -> Share:
-
-        if isinstance(expr, Secret):
-            return self.get_share(expr)
-
-        # Only one party uses the actual value of a scalar, others get 0 
-        elif isinstance(expr, Scalar):
-            return Share(str(0 if (ADD_SCALAR and self.get_self_id() != 0) else expr.value))
-
-        # Perform an operation on a scalar
-        elif isinstance(expr.a, Scalar) or isinstance(expr.b, Scalar):
-            scalar = expr.a if isinstance(expr.a, Scalar) else expr.b
-            secret = expr.b if isinstance(expr.a, Scalar) else expr.a
-
-            if isinstance(expr, MultOp): # directly perform scalar multiplication
-                return self.perform_operation(expr, Share(scalar.value), self.process_expression(secret))
-            else: # perform scalar addition, if expr is a substraction just negate the scalar
-                if self.get_self_id() == 0:
-                    return self.perform_operation(AddOp(scalar, secret), Share(scalar.value if isinstance(expr, AddOp) else -scalar.value), self.process_expression(secret, ADD_SCALAR=True))
-                else:
-                    return self.process_expression(secret)
-
-        # Perform an operation between 2 secrets
-        elif (isinstance(expr.a, Secret) and isinstance(expr.b, Secret)) or isinstance(expr, MultOp):
-            if isinstance(expr, MultOp):
-                expr_a = self.process_expression(expr.a)
-                expr_b = self.process_expression(expr.b)
-                return self.perform_secret_multiplication(expr, expr_a, expr_b)
-            else:
-                return self.perform_operation(expr, self.get_share(expr.a), self.get_share(expr.b))
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Enough workers for one pending retrieval per client
+        self.async_comm = AsyncCommunication(self.comm, max_workers=len(self.protocol_spec.participant_ids) + 1)
 
-        # Directly perform the operation on the share results
-        else:
-            return self.perform_operation(expr, self.process_expression(expr.a), self.process_expression(expr.b))
\ No newline at end of file
+    def run(self) -> int:
+        """
+        Run the SMC on a new event loop.
+        """
+        try:
+            return asyncio.run(self.run_async())
+        finally:
+            self.async_comm.close()
+
+    async def run_async(self) -> int:
+        """
+        The coroutine the client use to do the SMC.
+        """
+
+        start = time.time()
+        participant_ids = self.protocol_spec.participant_ids
+
+        # broadcast and get secrets ids from clients
+        with self.metrics.phase("id exchange"):
+            await self.publish_message_async("client_secrets_id", self.secret_ids_message())
+            self.set_secret_ids(await self.retrieve_public_messages_async(participant_ids, "client_secrets_id"))
+
+        # broadcast own secret's shares to clients, and retrieve own share for each secret
+        with self.metrics.phase("share distribution"):
+            await self.send_private_messages_async(self.share_messages())
+            self.set_shares(await self.retrieve_private_messages_async(self.secret_ids))
+
+        # compute and broadcast self's result share
+        my_share = await self.process_circuit_async()
+        with self.metrics.phase("result opening"):
+            await self.publish_message_async("computed share", pack_elements(my_share))
+            reconstructed = self.reconstruct_result(
+                await self.retrieve_public_messages_async(participant_ids, "computed share")
+            )
+
+        return self.result(reconstructed, time.time() - start)
+
+    # Asynchronous communication functions, recorded into the metrics like their synchronous counterparts
+    async def publish_message_async(self, label: str, msg: Union[bytes, str]):
+        await self.async_comm.publish_message(label, msg)
+
+    async def send_private_messages_async(self, messages: List[Tuple[str, str, Union[bytes, str]]]):
+        await self.async_comm.send_private_messages(messages)
+
+    async def retrieve_public_messages_async(self, sender_ids: List[str], label: str) -> List[bytes]:
+        return await asyncio.gather(*[
+            self.async_comm.retrieve_public_message(sender_id, label) for sender_id in sender_ids
+        ])
+
+    async def retrieve_private_messages_async(self, labels: List[str]) -> List[bytes]:
+        # Every share comes from the server in one batched request, as for the synchronous party
+        return await self.async_comm.retrieve_private_messages(labels)
+
+    async def process_circuit_async(self) -> ShareVector:
+        await asyncio.get_running_loop().run_in_executor(self.async_comm.executor, self.retrieve_triplets)
+
+        values: List[Optional[ShareVector]] = [None] * len(self.protocol_spec.circuit)
+        with self.metrics.phase("evaluation"):
+            for round_idx, slots in self.evaluate_circuit(values):
+                with self.metrics.phase(self.round_phase(round_idx)):
+                    await self.publish_message_async(f"castor_{round_idx}", self.mask_operands(slots, values))
+                    messages = await self.retrieve_public_messages_async(
+                        self.protocol_spec.participant_ids, f"castor_{round_idx}"
+                    )
+                    self.unmask_products(slots, values, messages)
+
+        return values[self.protocol_spec.circuit.output]
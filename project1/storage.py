@@ -0,0 +1,189 @@
+"""
+Bounded storage of the messages exchanged through the trusted server.
+"""
+
+import collections
+import threading
+import time
+from typing import (
+    Dict,
+    Hashable,
+    Iterable,
+    List,
+    Optional,
+    Set,
+)
+
+
+class StoreFullError(Exception):
+    """
+    A message does not fit in a pool, whose other messages are still awaited by their readers.
+    """
+
+
+class ChannelStore:
+    """
+    Messages of a pool, by channel, with eviction.
+
+    A message is evicted as soon as every one of its expected readers has retrieved it. Messages
+    that are not consumed are evicted once they have not been accessed for `ttl` seconds. When the
+    pool would hold more than `max_bytes`, the messages without any expected reader are evicted,
+    least recently used first; a message still awaited by a reader is never dropped for room, the
+    write is refused with a StoreFullError instead.
+
+    Attributes:
+        ttl: time in seconds after which a message that is not accessed is evicted
+        max_bytes: maximum number of bytes of message bodies and channel names held
+    """
+
+    def __init__(self, ttl: float = 600.0, max_bytes: int = 64 * 2 ** 20):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.resident_bytes = 0
+        # Entries ordered from the least to the most recently accessed
+        self.entries: "collections.OrderedDict[Hashable, _Entry]" = collections.OrderedDict()
+        # Notified whenever a message is stored, to wake up the readers waiting for it
+        self.lock = threading.Condition()
+
+
+    def __len__(self):
+        return len(self.entries)
+
+
+    def set(self, channel: Hashable, data: bytes, readers: Optional[Iterable[str]] = None) -> None:
+        """
+        Store a message. If readers are given, the message is evicted once all of them retrieved it.
+        Raises a StoreFullError, leaving the pool unchanged, if there is no room for the message.
+        """
+        entry = _Entry(channel, bytes(data), readers)
+        with self.lock:
+            self._evict()
+            replaced = self.entries.get(channel)
+            if not self._evict(entry.size - (replaced.size if replaced is not None else 0), channel):
+                raise StoreFullError(
+                    f"No room for a message of {entry.size} bytes: {self.resident_bytes} of "
+                    f"{self.max_bytes} bytes are held by messages awaiting their readers"
+                )
+            self._discard(channel)
+            self.entries[channel] = entry
+            self.resident_bytes += entry.size
+            self.lock.notify_all()
+
+
+    def get(self, channel: Hashable, reader: Optional[str] = None, timeout: float = 0) -> Optional[bytes]:
+        """
+        Retrieve a message, None if there is no message on this channel.
+        If a timeout is given, wait up to `timeout` seconds for the message to be stored.
+        """
+        with self.lock:
+            if timeout > 0:
+                self.lock.wait_for(lambda: channel in self.entries, timeout)
+            self._evict()
+            entry = self.entries.get(channel)
+            if entry is None:
+                return None
+
+            if entry.readers is not None:
+                entry.readers.discard(reader)
+                if not entry.readers:
+                    self._discard(channel)
+                    return entry.data
+
+            entry.accessed = time.monotonic()
+            self.entries.move_to_end(channel)
+            return entry.data
+
+
+    def get_many(
+            self,
+            channels: List[Hashable],
+            reader: Optional[str] = None,
+            timeout: float = 0,
+            wait_any: bool = False) -> Dict[Hashable, bytes]:
+        """
+        Retrieve the messages available on several channels.
+        If a timeout is given, wait up to `timeout` seconds for all of them to be stored, or for
+        any of them with `wait_any`.
+        """
+        wait = any if wait_any else all
+        with self.lock:
+            if timeout > 0:
+                self.lock.wait_for(lambda: wait(channel in self.entries for channel in channels), timeout)
+
+            res = {}
+            for channel in channels:
+                data = self.get(channel, reader)
+                if data is not None:
+                    res[channel] = data
+            return res
+
+
+    def clear(self) -> None:
+        """
+        Drop every message.
+        """
+        with self.lock:
+            self.entries.clear()
+            self.resident_bytes = 0
+
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Number of messages and bytes currently held.
+        """
+        with self.lock:
+            return {"entries": len(self.entries), "bytes": self.resident_bytes}
+
+
+    def _discard(self, channel: Hashable) -> None:
+        entry = self.entries.pop(channel, None)
+        if entry is not None:
+            self.resident_bytes -= entry.size
+
+
+    def _evict(self, incoming: int = 0, keep: Optional[Hashable] = None) -> bool:
+        """
+        Evict the expired messages, then, until `incoming` more bytes fit, the least recently used
+        messages without any expected reader, except the one on channel `keep`.
+        Returns whether `incoming` more bytes fit.
+        """
+        deadline = time.monotonic() - self.ttl
+        while self.entries:
+            channel, entry = next(iter(self.entries.items()))
+            if entry.accessed > deadline:
+                break
+            self._discard(channel)
+
+        if self.resident_bytes + incoming <= self.max_bytes:
+            return True
+        for channel in [channel for channel, entry in self.entries.items() if entry.readers is None and channel != keep]:
+            self._discard(channel)
+            if self.resident_bytes + incoming <= self.max_bytes:
+                return True
+        return False
+
+
+class _Entry:
+    """
+    A stored message.
+    """
+
+    __slots__ = ("data", "readers", "accessed", "size")
+
+    def __init__(self, channel: Hashable, data: bytes, readers: Optional[Iterable[str]]):
+        self.data = data
+        # Without any expected reader, the message is only evicted by TTL or LRU
+        self.readers: Optional[Set[str]] = set(readers) if readers is not None else None
+        if not self.readers:
+            self.readers = None
+        self.accessed = time.monotonic()
+        self.size = len(data) + _channel_size(channel)
+
+
+def _channel_size(channel: Hashable) -> int:
+    """
+    Approximate number of bytes of the name of a channel.
+    """
+    if isinstance(channel, tuple):
+        return sum(len(part) for part in channel)
+    return len(channel)
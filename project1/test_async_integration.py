@@ -0,0 +1,72 @@
+"""
+Integration tests of the asyncio SMC client.
+"""
+
+from unittest import mock
+
+from expression import Scalar, Secret
+from protocol import ProtocolSpec
+import test_integration
+
+from smc_party import AsyncSMCParty
+
+
+def smc_client(client_id, prot, value_dict, queue):
+    cli = AsyncSMCParty(
+        client_id,
+        "localhost",
+        5000,
+        protocol_spec=prot,
+        value_dict=value_dict
+    )
+    res = cli.run()
+    queue.put(res)
+    print(f"{client_id} has finished!")
+
+
+def suite(parties, expr, expected):
+    with mock.patch.object(test_integration, "smc_client", smc_client):
+        test_integration.suite(parties, expr, expected)
+
+
+def test_async_multiplications():
+    """
+    f(a, b, c) = (a ∗ b) + (b ∗ c) + (c ∗ a)
+    """
+    alice_secret = Secret()
+    bob_secret = Secret()
+    charlie_secret = Secret()
+
+    parties = {
+        "Alice": {alice_secret: 3},
+        "Bob": {bob_secret: 14},
+        "Charlie": {charlie_secret: 2}
+    }
+
+    expr = (
+        (alice_secret * bob_secret) +
+        (bob_secret * charlie_secret) +
+        (charlie_secret * alice_secret)
+    )
+    expected = ((3 * 14) + (14 * 2) + (2 * 3))
+    suite(parties, expr, expected)
+
+
+def test_async_several_secrets_per_party():
+    alice_secret1 = Secret()
+    alice_secret2 = Secret()
+    bob_secret = Secret()
+    c_secret = Secret()
+
+    parties = {
+        "Alice": {
+            alice_secret1: 4,
+            alice_secret2: -3,
+        },
+        "Bob": { bob_secret: 9 },
+        "C": { c_secret: 12}
+    }
+
+    expr = (alice_secret1 * alice_secret2 + bob_secret) * c_secret - Scalar(5)
+    expected = (4 * -3 + 9) * 12 - 5
+    suite(parties, expr, expected)
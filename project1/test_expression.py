@@ -5,4 +5,171 @@ Testing expressions is not obligatory.
 MODIFY THIS FILE.
 """
 
-from expression import Secret, Scalar
+from expression import MultOp, Secret, Scalar
+from secret_sharing import DEFAULT_MODULUS, to_signed
+from circuit import (
+    OP_NAMES,
+    OP_ADD, OP_CONST, OP_INPUT, OP_LINEAR, OP_MUL, OP_MUL_CONST,
+    compile_expression,
+)
+
+
+def test_compile_folds_scalar_subtrees():
+    a, b = Secret(), Secret()
+    circuit = compile_expression((a + b) * (Scalar(2) * Scalar(3) + Scalar(1)))
+
+    assert [OP_NAMES[op] for op in circuit.ops] == ["INPUT", "INPUT", "LINEAR"]
+    combination = circuit.combinations[circuit.arg_a[circuit.output]]
+    assert combination.coefficients == [7, 7]
+
+
+def test_compile_public_expression():
+    circuit = compile_expression(Scalar(4) - Scalar(1) * Scalar(2))
+
+    assert circuit.ops == [OP_CONST]
+    assert circuit.arg_a[circuit.output] == 2
+
+
+def test_compile_shares_reused_nodes():
+    a, b = Secret(), Secret()
+    prod = a * b
+    circuit = compile_expression(prod + prod)
+
+    assert circuit.ops.count(OP_MUL) == 1
+
+
+def test_compile_deep_expression():
+    a, b = Secret(), Secret()
+    expr = a
+    for i in range(10000):
+        expr = expr * (a if i % 2 == 0 else b)
+
+    circuit = compile_expression(expr)
+    assert len(circuit) == 10002
+    assert len(circuit.rounds()) == 10000
+
+
+def test_compile_groups_multiplications_by_depth():
+    a, b, c, d, e = [Secret() for _ in range(5)]
+    circuit = compile_expression((a * b) * c + d * e)
+
+    rounds = circuit.rounds()
+    assert [end - start for start, end in rounds] == [2, 1]
+    for start, end in rounds:
+        for slot in range(start, end):
+            assert circuit.arg_a[slot] < start and circuit.arg_b[slot] < start
+
+
+def test_operations_are_hash_consed():
+    a, b = Secret(), Secret()
+
+    assert a * b is a * b
+    assert a * b is b * a
+    assert a + b is b + a
+    assert a - b is not b - a
+
+
+def test_compile_eliminates_common_subexpressions():
+    a, b, c = Secret(), Secret(), Secret()
+    # Operation nodes built without the operators are not hash-consed
+    expr = MultOp(a, b) + MultOp(b, a) * (c + Scalar(1)) - MultOp(a, b) * (c + Scalar(1))
+
+    circuit = compile_expression(expr)
+    assert circuit.ops.count(OP_MUL) == 2
+    assert [end - start for start, end in circuit.rounds()] == [1, 1]
+
+
+def test_circuit_consumers():
+    a, b = Secret(), Secret()
+    circuit = compile_expression((a + b) * a)
+
+    consumers = circuit.consumers()
+    assert [OP_NAMES[circuit.ops[i]] for i in consumers[circuit.output]] == []
+    for i in range(len(circuit)):
+        for slot in circuit.operands(i):
+            assert i in consumers[slot]
+
+
+def test_compile_collapses_linear_subtrees():
+    a, b, c = Secret(), Secret(), Secret()
+    expr = a
+    for i in range(4000):
+        expr = expr + (b if i % 2 == 0 else c)
+    circuit = compile_expression(Scalar(10) - (expr - a * Scalar(3)) * Scalar(2))
+
+    assert [OP_NAMES[op] for op in circuit.ops] == ["INPUT", "INPUT", "INPUT", "LINEAR"]
+    combination = circuit.combinations[circuit.arg_a[circuit.output]]
+    terms = dict(zip([circuit.labels[slot] for slot in combination.slots], combination.coefficients))
+    assert terms == {a.id.decode(): 4, b.id.decode(): -4000, c.id.decode(): -4000}
+    assert combination.constant == 10
+
+
+def test_compile_keeps_linear_operands_of_multiplications():
+    a, b, c = Secret(), Secret(), Secret()
+    shared = a + b - c
+    circuit = compile_expression(shared * c + shared * Scalar(2) + a)
+
+    assert circuit.ops.count(OP_MUL) == 1
+    # (a + b) - c is computed once for the multiplication, and reused by the output combination
+    mul = circuit.ops.index(OP_MUL)
+    assert OP_NAMES[circuit.ops[circuit.arg_a[mul]]] in ("LINEAR", "INPUT")
+    assert circuit.ops[circuit.output] == OP_LINEAR
+
+
+def test_compile_cancelled_terms():
+    a, b = Secret(), Secret()
+
+    circuit = compile_expression(a + b - a)
+    assert circuit.ops == [OP_INPUT, OP_INPUT] and circuit.labels[circuit.output] == b.id.decode()
+
+    circuit = compile_expression((a + b) - (b + a) + Scalar(3))
+    assert circuit.ops[circuit.output] == OP_CONST and circuit.arg_a[circuit.output] == 3
+
+    circuit = compile_expression(a + b)
+    assert circuit.ops[circuit.output] == OP_ADD
+
+
+def test_compile_folds_scalar_chains():
+    a, b = Secret(), Secret()
+    expr = a * b
+    for _ in range(4000):
+        expr = expr * Scalar(2)
+
+    circuit = compile_expression(expr)
+    assert [OP_NAMES[op] for op in circuit.ops] == ["INPUT", "INPUT", "MUL", "MUL_CONST"]
+    # The folded factor is reduced modulo the field
+    assert circuit.arg_b[circuit.output] == to_signed(2 ** 4000, DEFAULT_MODULUS)
+
+
+def test_compile_keeps_folded_constants_in_the_field():
+    a = Secret()
+    expr, constant = a + Scalar(1), Scalar(1)
+    for _ in range(20000):
+        expr = expr * Scalar(3)
+        constant = constant * Scalar(3)
+
+    circuit = compile_expression(expr + constant)
+    assert circuit.ops[circuit.output] == OP_LINEAR
+    combination = circuit.combinations[circuit.arg_a[circuit.output]]
+    factor = pow(3, 20000, DEFAULT_MODULUS)
+    assert combination.coefficients == [to_signed(factor, DEFAULT_MODULUS)]
+    assert combination.constant == to_signed(2 * factor, DEFAULT_MODULUS)
+
+
+def test_compile_moves_factors_out_of_multiplications():
+    a, b, c = Secret(), Secret(), Secret()
+    circuit = compile_expression((a * Scalar(3)) * (b * Scalar(5)) * Scalar(2) + (a * b) * c)
+
+    # Both products of a and b are the same multiplication
+    assert circuit.ops.count(OP_MUL) == 2
+    assert circuit.ops.count(OP_MUL_CONST) == 0
+    combination = circuit.combinations[circuit.arg_a[circuit.output]]
+    assert sorted(combination.coefficients) == [1, 30]
+
+
+def test_compile_multiplication_by_cancelled_value():
+    a, b = Secret(), Secret()
+    circuit = compile_expression((a - a + Scalar(4)) * b + Scalar(1))
+
+    assert OP_MUL not in circuit.ops
+    assert OP_NAMES[circuit.ops[circuit.output]] == "LINEAR"
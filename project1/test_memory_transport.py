@@ -0,0 +1,83 @@
+"""
+Integration tests run in a single process, through the in-memory transport.
+"""
+
+import threading
+from unittest import mock
+
+import pytest
+
+from memory_transport import MemoryTransport
+import test_integration
+from expression import Secret
+from protocol import ProtocolSpec
+
+from smc_party import AsyncSMCParty, SMCParty
+
+
+def run_threads(server_args, *client_args, party_class=SMCParty):
+    transport = MemoryTransport(server_args)
+    results = []
+
+    def client(client_id, prot, value_dict):
+        party = party_class(client_id, None, None, protocol_spec=prot, value_dict=value_dict, transport=transport)
+        results.append(party.run())
+
+    threads = [threading.Thread(target=client, args=args) for args in client_args]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+INTEGRATION_TESTS = sorted(name for name in dir(test_integration) if name.startswith("test_"))
+
+
+@pytest.mark.parametrize("name", INTEGRATION_TESTS)
+def test_integration_in_memory(name):
+    with mock.patch.object(test_integration, "run_processes", run_threads):
+        getattr(test_integration, name)()
+
+
+def test_async_integration_in_memory():
+    def run_async_threads(server_args, *client_args):
+        return run_threads(server_args, *client_args, party_class=AsyncSMCParty)
+
+    with mock.patch.object(test_integration, "run_processes", run_async_threads):
+        test_integration.test_suite8()
+
+
+def test_public_messages_are_consumed_by_every_participant():
+    transport = MemoryTransport(["Alice", "Bob"])
+    transport.publish_message("Alice", "label", "message")
+
+    assert transport.retrieve_public_messages("Alice", ["Alice"], "label") == [b"message"]
+    assert transport.store["public"].stats()["entries"] == 1
+    assert transport.retrieve_public_message("Bob", "Alice", "label") == b"message"
+    assert transport.store["public"].stats()["entries"] == 0
+
+
+def test_multiplications_with_colliding_ids():
+    alice_secret, bob_secret, charlie_secret = Secret(), Secret(), Secret()
+    with mock.patch("expression.gen_id", return_value=b"AAAAAA=="):
+        expr = alice_secret * bob_secret + bob_secret * charlie_secret + alice_secret * charlie_secret
+    parties = {"Alice": {alice_secret: 3}, "Bob": {bob_secret: 5}, "Charlie": {charlie_secret: 2}}
+    prot = ProtocolSpec(expr=expr, participant_ids=list(parties))
+
+    results = run_threads(list(parties), *[(name, prot, values) for name, values in parties.items()])
+    assert results == [31, 31, 31]
+
+
+def test_async_party_retrieves_its_shares_in_one_request():
+    secrets = [Secret() for _ in range(50)]
+    expr = secrets[0]
+    for secret in secrets[1:]:
+        expr = expr + secret
+    prot = ProtocolSpec(expr=expr, participant_ids=["Alice"])
+
+    party = AsyncSMCParty("Alice", None, None, protocol_spec=prot, value_dict={secret: 1 for secret in secrets},
+                          transport=MemoryTransport(["Alice"]))
+    assert party.run() == 50
+    # One request sending the shares, one retrieving them
+    assert party.metrics.phases["share distribution"].requests == 2
@@ -0,0 +1,67 @@
+"""
+Unit tests for the instrumentation of the protocol phases.
+"""
+
+import json
+import threading
+import time
+
+from expression import Secret
+from memory_transport import MemoryTransport
+from metrics import Metrics, OTHER_PHASE
+from protocol import ProtocolSpec
+
+from smc_party import SMCParty
+
+
+def test_nested_phases_are_exclusive():
+    metrics = Metrics()
+    with metrics.phase("outer"):
+        time.sleep(0.02)
+        with metrics.phase("inner"):
+            time.sleep(0.05)
+            metrics.record(requests=1, bytes_in=10)
+        metrics.record(requests=1, poll_retries=2, bytes_out=5)
+    metrics.record(requests=1)
+
+    phases = metrics.to_dict()["phases"]
+    assert list(phases) == ["outer", "inner", OTHER_PHASE]
+    assert 0.02 <= phases["outer"]["wall_time"] < 0.05
+    assert phases["inner"]["wall_time"] >= 0.05
+    assert phases["outer"]["poll_retries"] == 2
+    assert metrics.total()["requests"] == 3
+    assert json.loads(metrics.to_json())["total"]["bytes_out"] == 5
+
+
+def test_party_metrics():
+    alice_secret, bob_secret = Secret(), Secret()
+    prot = ProtocolSpec(["Alice", "Bob"], alice_secret * bob_secret * alice_secret)
+    transport = MemoryTransport(["Alice", "Bob"])
+    results = {}
+
+    def client(client_id, value_dict):
+        party = SMCParty(client_id, None, None, prot, value_dict, performance_evaluation=True, transport=transport)
+        results[client_id] = party.run()
+
+    threads = [
+        threading.Thread(target=client, args=("Alice", {alice_secret: 3})),
+        threading.Thread(target=client, args=("Bob", {bob_secret: 5})),
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    value, _, bytes_in, bytes_out, metrics = results["Alice"]
+    assert value == 45
+    assert list(metrics["phases"]) == [
+        "id exchange", "share distribution", "triplet retrieval", "evaluation",
+        "multiplication rounds", "result opening",
+    ]
+    # Two triplets of three 8-byte shares
+    assert metrics["phases"]["triplet retrieval"]["bytes_in"] == 2 * 3 * 8
+    # One share of 8 bytes after its 4-byte count, to each party
+    assert metrics["phases"]["share distribution"]["bytes_out"] == 2 * 12
+    # A publication and a retrieval in each of the two rounds
+    assert metrics["phases"]["multiplication rounds"]["requests"] == 4
+    assert (bytes_in, bytes_out) == (metrics["total"]["bytes_in"], metrics["total"]["bytes_out"])
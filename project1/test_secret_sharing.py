@@ -3,4 +3,80 @@ Unit tests for the secret sharing scheme.
 Testing secret sharing is not obligatory.
 
 MODIFY THIS FILE.
-"""
\ No newline at end of file
+"""
+import numpy as np
+
+from secret_sharing import (
+    DEFAULT_MODULUS,
+    Share,
+    dot_mod,
+    random_elements,
+    reconstruct_secret,
+    reconstruct_secrets,
+    share_secret,
+    share_secrets,
+)
+
+
+def test_share_and_reconstruct():
+    for secret in [0, 1, 42, -7, 2 ** 40]:
+        for num_shares in [1, 2, 5]:
+            shares = share_secret(secret, num_shares)
+            assert len(shares) == num_shares
+            assert reconstruct_secret(shares) == secret
+
+
+def test_share_values_stay_in_field():
+    shares = share_secret(-3, 4)
+    for share in shares:
+        assert 0 <= share.value < DEFAULT_MODULUS
+
+
+def test_share_arithmetic_is_modular():
+    a = share_secret(6, 3)
+    b = share_secret(-4, 3)
+
+    assert reconstruct_secret([x + y for x, y in zip(a, b)]) == 2
+    assert reconstruct_secret([x - y for x, y in zip(a, b)]) == 10
+    assert reconstruct_secret([x * 5 for x in a]) == 30
+
+    big = Share(DEFAULT_MODULUS - 1)
+    assert (big * big).value == 1
+    assert (big + Share(1)).value == 0
+
+
+def test_custom_modulus():
+    shares = share_secret(5, 3, modulus=101)
+    assert all(share.modulus == 101 and share.value < 101 for share in shares)
+    assert reconstruct_secret(shares) == 5
+
+
+def test_share_and_reconstruct_batch():
+    secrets = [0, 1, -1, 42, -2 ** 40, DEFAULT_MODULUS // 2]
+    for num_shares in [1, 2, 10, 150]:
+        shares = share_secrets(secrets, num_shares)
+        assert shares.shape == (num_shares, len(secrets))
+        assert (shares < DEFAULT_MODULUS).all()
+        assert reconstruct_secrets(shares) == secrets
+
+
+def test_batch_shares_match_scalar_shares():
+    shares = share_secrets([7, -3], 4)
+    assert reconstruct_secret([Share(int(value)) for value in shares[:, 0]]) == 7
+    assert reconstruct_secret([Share(int(value)) for value in shares[:, 1]]) == -3
+
+
+def test_dot_mod_matches_python_integers():
+    a = random_elements(1000)
+    b = random_elements(1000)
+    b[:3] = [0, 1, DEFAULT_MODULUS - 1]
+    expected = sum(int(x) * int(y) for x, y in zip(a, b)) % DEFAULT_MODULUS
+    assert dot_mod(a, b) == expected
+    assert dot_mod(np.zeros(0, dtype=np.uint64), np.zeros(0, dtype=np.uint64)) == 0
+
+
+def test_dot_mod_with_matrix():
+    a = random_elements(50)
+    matrix = random_elements((50, 4))
+    expected = [sum(int(x) * int(y) for x, y in zip(a, column)) % DEFAULT_MODULUS for column in matrix.T]
+    assert dot_mod(a, matrix).tolist() == expected
@@ -0,0 +1,118 @@
+"""
+Unit tests for the trusted server endpoints.
+"""
+
+import base64
+import json
+
+import pytest
+
+import server
+from secret_sharing import DEFAULT_MODULUS
+from wire import BINARY_CONTENT_TYPE, pack_frames, unpack_elements, unpack_frames
+
+
+@pytest.fixture
+def client():
+    test_client = server.app.test_client()
+    body = json.dumps({"participants": ["Alice", "Bob"]})
+    assert test_client.post(f"/sessions/{server.DEFAULT_SESSION}", data=body).status_code == 200
+    yield test_client
+    test_client.delete(f"/sessions/{server.DEFAULT_SESSION}")
+
+
+def decode(res):
+    return {key: base64.b64decode(value) for key, value in res.get_json().items()}
+
+
+def test_batch_private_messages(client):
+    body = json.dumps([
+        ["Bob", "l1", base64.b64encode(b"1").decode()],
+        ["Bob", "l2", base64.b64encode(b"2").decode()],
+        ["Alice", "l1", base64.b64encode(b"3").decode()],
+    ])
+    assert client.post("/private/Alice", data=body).status_code == 200
+
+    assert decode(client.get("/private/Bob?labels=l1,l2,l3")) == {"l1": b"1", "l2": b"2"}
+    assert client.get("/private/Alice/l1").data == b"3"
+
+
+def test_batch_public_messages(client):
+    client.post("/public/Alice/label", data=b"a")
+    assert decode(client.get("/public/Bob/label?senders=Alice,Bob")) == {"Alice": b"a"}
+
+    client.post("/public/Bob/label", data=b"b")
+    assert decode(client.get("/public/Bob/label?senders=Bob&wait=1")) == {"Bob": b"b"}
+
+
+def test_stats_report_resident_bytes(client):
+    client.post("/public/Alice/label", data=b"x" * 100)
+    stats = client.get("/stats").get_json()
+    assert stats["public"] == {"entries": 1, "bytes": 100 + len("Alice") + len("label")}
+
+    client.get("/public/Alice/Alice/label")
+    client.get("/public/Bob/Alice/label")
+    assert client.get("/stats").get_json()["public"] == {"entries": 0, "bytes": 0}
+
+
+def test_message_without_room_is_refused(client, monkeypatch):
+    monkeypatch.setattr(server.sessions[server.DEFAULT_SESSION].store["private"], "max_bytes", 1000)
+    assert client.post("/private/Alice/Bob/l1", data=b"x" * 600).status_code == 200
+    assert client.post("/private/Alice/Bob/l2", data=b"x" * 600).status_code == 507
+    assert client.get("/private/Bob/l1").data == b"x" * 600
+
+
+def test_sessions_are_isolated(client):
+    body = json.dumps({"participants": ["Alice", "Bob"]})
+    assert client.post("/sessions/other", data=body).status_code == 200
+    assert client.post("/sessions/other", data=body).status_code == 409
+    assert client.get("/sessions").get_json() == [server.DEFAULT_SESSION, "other"]
+
+    client.post("/public/Alice/label", data=b"default")
+    client.post("/sessions/other/public/Alice/label", data=b"other")
+    assert client.get("/public/Bob/Alice/label").data == b"default"
+    assert client.get("/sessions/other/public/Bob/Alice/label").data == b"other"
+
+    default_triplet = client.get("/shares/Alice/op").get_json()
+    other_triplet = client.get("/sessions/other/shares/Alice/op").get_json()
+    assert default_triplet != other_triplet
+
+    assert client.delete("/sessions/other").status_code == 200
+    assert client.delete("/sessions/other").status_code == 404
+    assert client.get("/sessions/other/public/Bob/Alice/label").status_code == 400
+
+
+def test_binary_content_type(client):
+    body = pack_frames(["Bob", "l1", b"\x00\xff", "Bob", "l2", b"2"])
+    headers = {"Content-Type": BINARY_CONTENT_TYPE}
+    assert client.post("/private/Alice", data=body, headers=headers).status_code == 200
+
+    res = client.get("/private/Bob?labels=l1,l2", headers={"Accept": BINARY_CONTENT_TYPE})
+    assert res.content_type == BINARY_CONTENT_TYPE
+    assert unpack_frames(res.data) == [b"l1", b"\x00\xff", b"l2", b"2"]
+
+    alice = client.post("/shares/Alice", data="op1,op2", headers={"Accept": BINARY_CONTENT_TYPE})
+    assert alice.content_type == BINARY_CONTENT_TYPE
+    bob = client.post("/shares/Bob", data="op1,op2")
+    for alice_triplet, bob_triplet in zip(unpack_elements(alice.data).reshape(-1, 3).tolist(), bob.get_json()):
+        a, b, c = (x + y for x, y in zip(alice_triplet, bob_triplet))
+        assert (a * b - c) % DEFAULT_MODULUS == 0
+
+
+def test_wait_for_any_private_message(client):
+    client.post("/private/Alice/Bob/l2", data=b"2")
+    res = client.get("/private/Bob?labels=l1,l2&wait=5&any=1")
+    assert decode(res) == {"l2": b"2"}
+
+
+def test_seeded_triplet_corrections(client):
+    assert len(client.get("/seeds/Alice").data) == 16
+
+    # Bob is the last participant, the only one getting corrections
+    body = client.post("/corrections/Bob", data="op1,op2").get_json()
+    assert len(body["corrections"]) == 2
+
+    res = client.post("/corrections/Alice", data="op1,op2", headers={"Accept": BINARY_CONTENT_TYPE})
+    nonce, corrections = unpack_frames(res.data)
+    assert nonce == base64.b64decode(body["nonce"])
+    assert len(unpack_elements(corrections)) == 0
@@ -0,0 +1,65 @@
+"""
+Integration tests of several protocols run concurrently on a single server, in separate sessions.
+"""
+
+import threading
+from multiprocessing import Process
+
+from communication import create_session, delete_session, wait_for_server
+from expression import Scalar, Secret
+from protocol import ProtocolSpec
+from server import run
+
+from smc_party import SMCParty
+
+
+PORT = 5002
+
+
+def smc_server():
+    run("localhost", PORT, [], log_level="WARNING")
+
+
+def run_session(session_id, parties, expr, results):
+    participants = list(parties.keys())
+    prot = ProtocolSpec(expr=expr, participant_ids=participants)
+    create_session("localhost", PORT, session_id, participants)
+
+    def client(client_id, value_dict):
+        party = SMCParty(client_id, "localhost", PORT, prot, value_dict, session_id=session_id)
+        results.append((session_id, party.run()))
+
+    threads = [threading.Thread(target=client, args=item) for item in parties.items()]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    delete_session("localhost", PORT, session_id)
+
+
+def test_concurrent_sessions():
+    server = Process(target=smc_server)
+    server.start()
+    try:
+        wait_for_server(f"http://localhost:{PORT}")
+
+        expected = {}
+        sessions = []
+        results = []
+        for i in range(4):
+            alice_secret, bob_secret = Secret(), Secret()
+            # The same party names are used in every session
+            parties = {"Alice": {alice_secret: i}, "Bob": {bob_secret: 10}}
+            expr = alice_secret * bob_secret + Scalar(i)
+            expected[f"run{i}"] = i * 10 + i
+            sessions.append(threading.Thread(target=run_session, args=(f"run{i}", parties, expr, results)))
+
+        for session in sessions:
+            session.start()
+        for session in sessions:
+            session.join()
+    finally:
+        server.terminate()
+        server.join()
+
+    assert sorted(results) == sorted((session_id, value) for session_id, value in expected.items() for _ in range(2))
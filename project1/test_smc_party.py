@@ -0,0 +1,208 @@
+"""
+Unit tests for the SMC party.
+"""
+
+import threading
+import time
+
+import pytest
+
+from expression import Scalar, Secret
+from memory_transport import MemoryTransport
+from protocol import ProtocolSpec
+from smc_party import SMCParty
+
+
+def make_party(expr, layered=True):
+    prot = ProtocolSpec(participant_ids=["Alice", "Bob"], expr=expr)
+    return SMCParty("Alice", "localhost", 5000, protocol_spec=prot, value_dict={}, layered=layered)
+
+
+def test_independent_multiplications_share_a_round():
+    a, b, c, d, e, f = [Secret() for _ in range(6)]
+    expr = (a * b + c * d + e * f) * Scalar(1500) - Scalar(200)
+
+    rounds = make_party(expr).multiplication_rounds()
+    assert len(rounds) == 1
+    assert len(rounds[0]) == 3
+
+
+def test_rounds_follow_multiplicative_depth():
+    a, b, c, d = [Secret() for _ in range(4)]
+    expr = a * b * c + (c - d) * Scalar(3) * a
+
+    rounds = make_party(expr).multiplication_rounds()
+    assert [len(ops) for ops in rounds] == [2, 1]
+
+
+def test_scalar_multiplications_need_no_round():
+    a, b = Secret(), Secret()
+    expr = (a + b) * Scalar(5) * (Scalar(2) + Scalar(3))
+
+    assert make_party(expr).multiplication_rounds() == []
+
+
+def test_sequential_mode_uses_one_round_per_multiplication():
+    a, b, c, d = [Secret() for _ in range(4)]
+    expr = a * b + c * d
+
+    rounds = make_party(expr, layered=False).multiplication_rounds()
+    assert [len(ops) for ops in rounds] == [1, 1]
+
+
+class SlowBobTransport(MemoryTransport):
+    """
+    In-memory transport delaying the shares sent by Bob.
+    """
+
+    def send_private_messages(self, client_id, messages):
+        if client_id == "Bob":
+            time.sleep(0.1)
+        super().send_private_messages(client_id, messages)
+
+
+def test_evaluation_starts_before_all_shares_arrive():
+    a1, a2, b = Secret(), Secret(), Secret()
+    prot = ProtocolSpec(participant_ids=["Alice", "Bob"], expr=(a1 + a2) * Scalar(2) + b)
+    transport = SlowBobTransport(["Alice", "Bob"])
+    parties = {
+        "Alice": SMCParty("Alice", None, None, prot, {a1: 3, a2: 4}, transport=transport),
+        "Bob": SMCParty("Bob", None, None, prot, {b: 5}, transport=transport),
+    }
+    results = {}
+
+    def client(client_id):
+        results[client_id] = parties[client_id].run()
+
+    threads = [threading.Thread(target=client, args=(client_id,)) for client_id in parties]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == {"Alice": 19, "Bob": 19}
+    # Alice sent her shares, received her own shares first, then Bob's share in a second retrieval
+    retrievals = parties["Alice"].metrics.to_dict()["phases"]["share distribution"]["requests"]
+    assert retrievals == 3
+
+
+def test_large_linear_combination():
+    secrets = [Secret() for _ in range(300)]
+    expr = Scalar(-7)
+    for i, secret in enumerate(secrets):
+        expr = expr + secret * Scalar(i % 5 - 2) if i % 3 else expr - secret
+    participant_ids = [str(i) for i in range(3)]
+    values = {secret: i - 150 for i, secret in enumerate(secrets)}
+    expected = -7 + sum(
+        values[secret] * (i % 5 - 2) if i % 3 else -values[secret] for i, secret in enumerate(secrets)
+    )
+
+    prot = ProtocolSpec(participant_ids=participant_ids, expr=expr)
+    transport = MemoryTransport(participant_ids)
+    results = []
+
+    def client(client_id):
+        value_dict = {secret: values[secret] for i, secret in enumerate(secrets) if i % 3 == int(client_id)}
+        results.append(SMCParty(client_id, None, None, prot, value_dict, transport=transport).run())
+
+    threads = [threading.Thread(target=client, args=(client_id,)) for client_id in participant_ids]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == [expected] * 3
+
+
+def run_parties(prot, value_dicts, **options):
+    transport = MemoryTransport(prot.participant_ids)
+    parties = {
+        client_id: SMCParty(client_id, None, None, prot, value_dict, transport=transport, **options)
+        for client_id, value_dict in value_dicts.items()
+    }
+    results = {}
+
+    def client(client_id):
+        results[client_id] = parties[client_id].run()
+
+    threads = [threading.Thread(target=client, args=(client_id,)) for client_id in parties]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return parties, results
+
+
+def test_vector_mode_computes_element_wise():
+    a, b, c, k = Secret(), Secret(), Secret(), Secret()
+    expr = (a * b + c) * k - a * Scalar(3) + Scalar(5)
+    a_values = list(range(-500, 500))
+    b_values = [x * 7 % 13 for x in range(1000)]
+    c_values = [x ** 2 for x in range(1000)]
+    prot = ProtocolSpec(participant_ids=["Alice", "Bob", "Charlie"], expr=expr)
+
+    # k is a scalar secret, applying to every record
+    parties, results = run_parties(prot, {
+        "Alice": {a: a_values},
+        "Bob": {b: b_values, k: -2},
+        "Charlie": {c: c_values},
+    }, round_metrics=True)
+
+    expected = [(x * y + z) * -2 - x * 3 + 5 for x, y, z in zip(a_values, b_values, c_values)]
+    assert results == {"Alice": expected, "Bob": expected, "Charlie": expected}
+    # The multiplications of every record are performed in the same two rounds
+    phases = parties["Alice"].metrics.to_dict()["phases"]
+    assert [name for name in phases if name.startswith("multiplication round")] == [
+        "multiplication round 0", "multiplication round 1",
+    ]
+
+
+def test_vector_mode_large_linear_combination():
+    secrets = [Secret() for _ in range(100)]
+    expr = Scalar(1)
+    for i, secret in enumerate(secrets):
+        expr = expr + secret * Scalar(i)
+    prot = ProtocolSpec(participant_ids=["Alice", "Bob"], expr=expr)
+
+    _, results = run_parties(prot, {
+        "Alice": {secret: [i, -i] for i, secret in enumerate(secrets) if i % 2},
+        "Bob": {secret: [i, -i] for i, secret in enumerate(secrets) if not i % 2},
+    })
+
+    expected = 1 + sum(i * i for i in range(100))
+    assert results == {"Alice": [expected, 2 - expected], "Bob": [expected, 2 - expected]}
+
+
+def test_vector_secrets_of_different_widths_are_rejected():
+    a, b = Secret(), Secret()
+    party = make_party(a + b)
+    with pytest.raises(ValueError):
+        party.set_secret_ids([f"{a.id.decode()}:3".encode(), f"{b.id.decode()}:4".encode()])
+
+
+def test_seeded_triplets():
+    a, b, c = Secret(), Secret(), Secret()
+    prot = ProtocolSpec(participant_ids=["Alice", "Bob", "Charlie"], expr=a * b * c + a * c)
+    value_dicts = {"Alice": {a: [3, -4, 5] * 100}, "Bob": {b: 7}, "Charlie": {c: -2}}
+    expected = [x * 7 * -2 + x * -2 for x in [3, -4, 5] * 100]
+
+    dealt, results = run_parties(prot, value_dicts)
+    assert list(results.values()) == [expected] * 3
+    seeded, results = run_parties(prot, value_dicts, seeded_triplets=True)
+    assert list(results.values()) == [expected] * 3
+
+    def triplet_bytes(parties):
+        phases = [party.metrics.to_dict()["phases"]["triplet retrieval"] for party in parties.values()]
+        return sum(phase["bytes_in"] for phase in phases)
+
+    # The dealer only sends one correction per triplet, plus a seed and a nonce per client
+    assert triplet_bytes(dealt) == 3 * 3 * 8 * 900
+    assert triplet_bytes(seeded) == 8 * 900 + 3 * 2 * 16
+
+
+def test_vector_mode_folded_vector_secret():
+    v, s = Secret(), Secret()
+    prot = ProtocolSpec(participant_ids=["Alice", "Bob"], expr=v * Scalar(0) + s * Scalar(0) + Scalar(3))
+
+    _, results = run_parties(prot, {"Alice": {v: [1, 2, 3]}, "Bob": {s: 5}})
+    assert results == {"Alice": [3, 3, 3], "Bob": [3, 3, 3]}
@@ -0,0 +1,110 @@
+"""
+Unit tests for the bounded message storage of the trusted server.
+"""
+
+import threading
+import time
+
+import pytest
+
+from storage import ChannelStore, StoreFullError
+
+
+def test_message_evicted_once_consumed():
+    store = ChannelStore()
+    store.set(("Alice", "label"), b"data", ["Alice", "Bob"])
+
+    assert store.get(("Alice", "label"), "Alice") == b"data"
+    assert store.get(("Alice", "label"), "Alice") == b"data"
+    assert store.stats()["entries"] == 1
+
+    assert store.get(("Alice", "label"), "Bob") == b"data"
+    assert store.get(("Alice", "label"), "Bob") is None
+    assert store.stats() == {"entries": 0, "bytes": 0}
+
+
+def test_message_without_readers_is_kept():
+    store = ChannelStore()
+    store.set(("Alice", "label"), b"data", [])
+
+    for _ in range(3):
+        assert store.get(("Alice", "label"), "Bob") == b"data"
+
+
+def test_expired_messages_are_evicted():
+    store = ChannelStore(ttl=0.05)
+    store.set(("Alice", "old"), b"data")
+    time.sleep(0.1)
+    store.set(("Alice", "new"), b"data")
+
+    assert store.get(("Alice", "old")) is None
+    assert store.get(("Alice", "new")) == b"data"
+
+
+def test_least_recently_used_messages_are_evicted():
+    store = ChannelStore(max_bytes=3 * (10 + 2))
+    for label in ["l1", "l2", "l3"]:
+        store.set(label, b"0123456789")
+    store.get("l1")
+    store.set("l4", b"0123456789")
+
+    assert store.get("l2") is None
+    assert all(store.get(label) is not None for label in ["l1", "l3", "l4"])
+    assert store.stats() == {"entries": 3, "bytes": 36}
+
+
+def test_awaited_messages_are_not_evicted():
+    store = ChannelStore(max_bytes=1000)
+    store.set(("Bob", "l1"), b"x" * 600, ["Bob"])
+    with pytest.raises(StoreFullError):
+        store.set(("Bob", "l2"), b"x" * 600, ["Bob"])
+
+    assert store.get(("Bob", "l1"), "Bob") == b"x" * 600
+    store.set(("Bob", "l2"), b"x" * 600, ["Bob"])
+    assert store.get(("Bob", "l2"), "Bob") == b"x" * 600
+
+
+def test_messages_without_readers_make_room_for_awaited_ones():
+    store = ChannelStore(max_bytes=1000)
+    store.set("l1", b"x" * 600)
+    store.set(("Bob", "l2"), b"x" * 600, ["Bob"])
+
+    assert store.get("l1") is None
+    assert store.get(("Bob", "l2"), "Bob") == b"x" * 600
+
+
+def test_oversized_message_is_refused():
+    store = ChannelStore(max_bytes=1000)
+    with pytest.raises(StoreFullError):
+        store.set(("Bob", "label"), b"x" * 2000, ["Bob"])
+    assert store.stats() == {"entries": 0, "bytes": 0}
+
+
+def test_resident_bytes_stay_flat_under_repeated_runs():
+    store = ChannelStore()
+    for run in range(100):
+        for party in ["Alice", "Bob"]:
+            store.set((party, f"label {run}"), b"x" * 100, ["Alice", "Bob"])
+        for reader in ["Alice", "Bob"]:
+            for party in ["Alice", "Bob"]:
+                store.get((party, f"label {run}"), reader)
+
+    assert store.stats() == {"entries": 0, "bytes": 0}
+
+
+def test_get_waits_for_message():
+    store = ChannelStore()
+    timer = threading.Timer(0.1, store.set, args=(("Alice", "label"), b"data"))
+    timer.start()
+
+    start = time.monotonic()
+    assert store.get(("Alice", "label"), "Bob", timeout=5) == b"data"
+    assert time.monotonic() - start < 1
+    timer.join()
+
+
+def test_get_wait_times_out():
+    store = ChannelStore()
+    start = time.monotonic()
+    assert store.get(("Alice", "label"), "Bob", timeout=0.1) is None
+    assert time.monotonic() - start >= 0.1
@@ -4,3 +4,94 @@ Testing ttp is not obligatory.
 
 MODIFY THIS FILE.
 """
+
+import numpy as np
+
+from secret_sharing import mul_mod, reconstruct_secret, sum_rows
+from ttp import TrustedParamGenerator, expand_triplets
+
+
+def test_beaver_triplet_shares():
+    ttp = TrustedParamGenerator()
+    for participant in ["Alice", "Bob", "Charlie"]:
+        ttp.add_participant(participant)
+
+    triplets = [ttp.retrieve_share(participant, "op") for participant in ["Alice", "Bob", "Charlie"]]
+    a, b, c = [reconstruct_secret(list(shares)) for shares in zip(*triplets)]
+    assert (a * b - c) % ttp.modulus == 0
+
+
+def test_same_operation_gets_same_triplet():
+    ttp = TrustedParamGenerator()
+    ttp.add_participant("Alice")
+    ttp.add_participant("Bob")
+
+    first = [share.value for share in ttp.retrieve_share("Alice", "op")]
+    assert [share.value for share in ttp.retrieve_share("Alice", "op")] == first
+    assert [share.value for share in ttp.retrieve_share("Alice", "other op")] != first
+
+
+def test_preprocessed_pool():
+    participants = ["Alice", "Bob"]
+    ttp = TrustedParamGenerator(batch_size=100)
+    for participant in participants:
+        ttp.add_participant(participant)
+
+    ttp.preprocess(250).join()
+    assert ttp.pool_size() == 250
+
+    op_ids = [f"op{i}" for i in range(300)]
+    batches = [ttp.retrieve_shares(participant, op_ids) for participant in participants]
+    for triplets in zip(*batches):
+        a, b, c = [reconstruct_secret(list(shares)) for shares in zip(*triplets)]
+        assert (a * b - c) % ttp.modulus == 0
+
+    # The pool ran out after 250 triplets, the 50 others come from a batch generated on demand
+    assert ttp.pool_size() == 50
+
+
+def test_consumed_triplets_are_dropped():
+    ttp = TrustedParamGenerator(batch_size=10)
+    ttp.add_participant("Alice")
+    ttp.add_participant("Bob")
+
+    for run in range(50):
+        for participant in ["Alice", "Bob"]:
+            ttp.retrieve_shares(participant, [f"op{run}", f"op{run} bis"])
+
+    stats = ttp.stats()
+    assert stats["triplets"] == {"entries": 0, "bytes": 0}
+    assert stats["triplet_pool"]["bytes"] <= 3 * 2 * 10 * 8
+
+
+def test_seeded_triplets():
+    participants = ["Alice", "Bob", "Charlie"]
+    ttp = TrustedParamGenerator()
+    for participant in participants:
+        ttp.add_participant(participant)
+
+    op_ids = [f"op{i}" for i in range(100)]
+    shares = []
+    for participant in participants:
+        nonce, corrections = ttp.retrieve_corrections(participant, op_ids)
+        expanded = expand_triplets(ttp.retrieve_seed(participant), nonce, len(op_ids))
+        # Only the last participant gets corrections, one per triplet
+        assert len(corrections) == (len(op_ids) if participant == "Charlie" else 0)
+        if len(corrections):
+            expanded[2] = corrections
+        shares.append(expanded)
+
+    a, b, c = [sum_rows(np.stack(matrices)) for matrices in zip(*shares)]
+    assert (mul_mod(a, b) == c).all()
+    assert ttp.stats()["seeded_batches"] == {"entries": 0, "bytes": 0}
+
+
+def test_seeded_batches_get_fresh_nonces():
+    ttp = TrustedParamGenerator()
+    ttp.add_participant("Alice")
+    ttp.add_participant("Bob")
+
+    first, _ = ttp.retrieve_corrections("Alice", ["op"])
+    assert ttp.retrieve_corrections("Bob", ["op"])[0] == first
+    # The batch was consumed by every participant, running the same operations again gets new triplets
+    assert ttp.retrieve_corrections("Alice", ["op"])[0] != first
@@ -0,0 +1,33 @@
+"""
+Unit tests for the binary wire format.
+"""
+
+import numpy as np
+import pytest
+
+from secret_sharing import DEFAULT_MODULUS
+from wire import pack_elements, pack_frames, unpack_elements, unpack_frames
+
+
+def test_elements_roundtrip():
+    values = [0, 1, DEFAULT_MODULUS - 1, 2 ** 64 - 1]
+    data = pack_elements(values)
+    assert len(data) == 4 + 8 * len(values)
+    assert data[4:12] == bytes(8)
+    assert unpack_elements(data).tolist() == values
+
+
+def test_elements_from_array():
+    values = np.arange(5, dtype=np.uint64)
+    assert unpack_elements(pack_elements(values)).tolist() == list(range(5))
+    assert unpack_elements(pack_elements([])).tolist() == []
+
+
+def test_frames_roundtrip():
+    frames = [b"", b"\x00\x01", "label"]
+    assert unpack_frames(pack_frames(frames)) == [b"", b"\x00\x01", b"label"]
+
+
+def test_truncated_frame():
+    with pytest.raises(ValueError):
+        unpack_frames(pack_frames([b"abc"])[:-1])
@@ -5,60 +5,305 @@ MODIFY THIS FILE.
 """
 
 import collections
+import hashlib
+import os
+import threading
+import time
 from typing import (
+    Deque,
     Dict,
+    List,
     Set,
     Tuple,
 )
-from random import randint
 
+import numpy as np
 
 from communication import Communication
 from secret_sharing import(
-    share_secret,
+    DEFAULT_MODULUS,
+    mul_mod,
+    random_elements,
+    share_secrets,
+    sub_mod,
+    sum_rows,
     Share,
 )
 
 # Feel free to add as many imports as you want.
 
+# Number of bytes of the seeds shared with the participants, and of the nonces of seeded batches
+SEED_BYTES = 16
+
+
+def expand_triplets(seed: bytes, nonce: bytes, count: int, modulus: int = DEFAULT_MODULUS) -> np.ndarray:
+    """
+    Expand the seed of a participant into its shares of a, b and c of a batch of `count` seeded
+    triplets, as a (3, count) uint64 matrix. The nonce of the batch makes every batch different.
+
+    The shares are drawn from the SHAKE-256 output of the seed and the nonce: every 64-bit word is
+    cut down to the bit length of the modulus, and rejected if it is not below the modulus, so that
+    the shares are uniform field elements.
+    """
+    size = 3 * count
+    mask = np.uint64((1 << modulus.bit_length()) - 1)
+    xof = hashlib.shake_256(seed + nonce)
+    length = size
+    while True:
+        # A longer output of SHAKE starts with the shorter one, so the elements drawn are kept
+        words = np.frombuffer(xof.digest(8 * length), dtype="<u8").astype(np.uint64) & mask
+        elements = words[words < modulus]
+        if len(elements) >= size:
+            return elements[:size].reshape(3, count)
+        length = 2 * length
+
 
 class TrustedParamGenerator:
     """
     A trusted third party that generates random values for the Beaver triplet multiplication scheme.
+
+    Triplets are generated in batches ahead of time (offline phase), and are only assigned to an
+    operation when a participant first asks for it (online phase). An assigned triplet is dropped
+    once every participant retrieved its shares, or after `ttl` seconds.
+
+    Triplets can be seeded instead: every participant shares a seed with the generator, from which
+    it expands its shares of a, b and c itself (see expand_triplets). The generator then only sends
+    the correction of c, to the last participant, so that the shares of c add up to a * b: one
+    value per triplet instead of three per participant.
+
+    Attributes:
+        modulus: prime modulus of the field of the shares
+        batch_size: number of triplets generated at once when the pool runs out
+        ttl: time in seconds after which an assigned triplet is dropped, even if not consumed
     """
 
 
-    def __init__(self):
+    def __init__(self, modulus: int = DEFAULT_MODULUS, batch_size: int = 256, ttl: float = 600.0):
         self.participant_ids: Set[str] = set()
-        self.dict_castor: Dict = {}
+        self.participant_rows: Dict[str, int] = {}
+        # Triplet assigned to each operation, ordered by assignment time
+        self.dict_castor: "collections.OrderedDict[str, _Assignment]" = collections.OrderedDict()
+        self.modulus = modulus
+        self.batch_size = batch_size
+        self.ttl = ttl
+
+        # Batches of triplets that are not assigned yet, the first one being used from pool_offset on
+        self.pool: Deque[np.ndarray] = collections.deque()
+        self.pool_offset = 0
+        self.lock = threading.Lock()
+
+        # Seed shared with each participant, and seeded batch of each list of operations
+        self.seeds: Dict[str, bytes] = {}
+        self.seeded_batches: "collections.OrderedDict[bytes, _SeededBatch]" = collections.OrderedDict()
 
 
     def add_participant(self, participant_id: str) -> None:
         """
-        Add a participant.
+        Add a participant. Participants must be added before triplets get generated.
         """
         self.participant_ids.add(participant_id)
+        self.participant_rows = {pid: row for row, pid in enumerate(sorted(self.participant_ids))}
+        self.seeds.setdefault(participant_id, os.urandom(SEED_BYTES))
 
     def retrieve_share(self, client_id: str, op_id: str) -> Tuple[Share, Share, Share]:
         """
         Retrieve a triplet of shares for a given client_id.
         """
-        if op_id not in self.dict_castor.keys():
-            a,b,c = self.generate_beaver()
-            a_shares = share_secret(a,len(self.participant_ids))
-            b_shares = share_secret(b,len(self.participant_ids))
-            c_shares = share_secret(c,len(self.participant_ids))
+        with self.lock:
+            self._evict()
+            assignment = self.dict_castor.get(op_id)
+            if assignment is None:
+                batch, col = self._next_triplet()
+                assignment = _Assignment(batch, col, self.participant_ids)
+                self.dict_castor[op_id] = assignment
+
+            # Every participant got its shares, the triplet will not be used anymore
+            assignment.readers.discard(client_id)
+            if not assignment.readers:
+                del self.dict_castor[op_id]
+
+        a, b, c = assignment.batch[:, self.participant_rows[client_id], assignment.col]
+        return (Share(int(a), self.modulus), Share(int(b), self.modulus), Share(int(c), self.modulus))
+
+    def retrieve_shares(self, client_id: str, op_ids: List[str]) -> List[Tuple[Share, Share, Share]]:
+        """
+        Retrieve the triplets of shares of several operations at once for a given client_id.
+        """
+        return [self.retrieve_share(client_id, op_id) for op_id in op_ids]
 
-            self.dict_castor[op_id] = {}
-            for idx,cid in enumerate(self.participant_ids):
-                self.dict_castor[op_id][cid] = (a_shares[idx], b_shares[idx], c_shares[idx])
+    def retrieve_seed(self, client_id: str) -> bytes:
+        """
+        Retrieve the seed of the seeded triplets of a given client_id.
+        """
+        return self.seeds[client_id]
+
+    def retrieve_corrections(self, client_id: str, op_ids: List[str]) -> Tuple[bytes, np.ndarray]:
+        """
+        Retrieve the nonce of the seeded triplets of several operations, with the corrections
+        of their shares of c for the last participant. Other participants get no corrections,
+        their shares of c being expanded from their seed like their shares of a and b.
+        """
+        key = hashlib.sha256(",".join(op_ids).encode()).digest()
+        with self.lock:
+            self._evict()
+            batch = self.seeded_batches.get(key)
+            if batch is None:
+                nonce = os.urandom(SEED_BYTES)
+                batch = _SeededBatch(nonce, self.generate_corrections(nonce, len(op_ids)), self.participant_ids)
+                self.seeded_batches[key] = batch
+
+            batch.readers.discard(client_id)
+            if not batch.readers:
+                del self.seeded_batches[key]
 
-        return self.dict_castor[op_id][client_id]
+        if self.participant_rows[client_id] != len(self.participant_ids) - 1:
+            return batch.nonce, np.zeros(0, dtype=np.uint64)
+        return batch.nonce, batch.corrections
 
     # Feel free to add as many methods as you want.
-    def generate_beaver(self):
-        a = randint(1,1000)
-        b = randint(1,1000)
-        c = a*b
-        return a,b,c
+    def generate_corrections(self, nonce: bytes, count: int) -> np.ndarray:
+        """
+        Expand the seeds of every participant for a batch of `count` seeded triplets, and compute
+        the shares of c of the last participant, so that the shares of c add up to a * b.
+        """
+        shares = np.stack([
+            expand_triplets(self.seeds[pid], nonce, count, self.modulus) for pid in sorted(self.participant_ids)
+        ], axis=1)
+        a = sum_rows(shares[0], self.modulus)
+        b = sum_rows(shares[1], self.modulus)
+        return sub_mod(mul_mod(a, b, self.modulus), sum_rows(shares[2, :-1], self.modulus), self.modulus)
+
+    def generate_triplets(self, count: int) -> np.ndarray:
+        """
+        Generate the shares of `count` Beaver triplets at once.
+
+        Returns a (3, num_participants, count) uint64 matrix holding, for each participant,
+        its shares of a, b and c = a * b.
+        """
+        num_participants = len(self.participant_ids)
+        shares = np.empty((3, num_participants, count), dtype=np.uint64)
+
+        # Random shares of a and b are enough to get random a and b
+        shares[0] = random_elements((num_participants, count), self.modulus)
+        shares[1] = random_elements((num_participants, count), self.modulus)
+        a = sum_rows(shares[0], self.modulus)
+        b = sum_rows(shares[1], self.modulus)
+        shares[2] = share_secrets(mul_mod(a, b, self.modulus), num_participants, self.modulus)
+
+        return shares
+
+    def preprocess(self, count: int) -> threading.Thread:
+        """
+        Fill the pool with `count` triplets in a background thread.
+        """
+        thread = threading.Thread(target=self._fill_pool, args=(count,), daemon=True)
+        thread.start()
+        return thread
+
+    def reset(self) -> None:
+        """
+        Drop every assigned triplet and seeded batch. The triplets of the pool that are not
+        assigned are kept.
+        """
+        with self.lock:
+            self.dict_castor.clear()
+            self.seeded_batches.clear()
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """
+        Number of triplets and bytes held, for the assigned triplets and the pool, and number of
+        seeded batches and bytes of their corrections.
+        A batch is counted as long as one of its triplets is held.
+        """
+        with self.lock:
+            assigned = {id(assignment.batch): assignment.batch for assignment in self.dict_castor.values()}
+            pool = {id(batch): batch for batch in self.pool}
+            return {
+                "triplets": {
+                    "entries": len(self.dict_castor),
+                    "bytes": sum(batch.nbytes for batch in assigned.values()),
+                },
+                "triplet_pool": {
+                    "entries": sum(batch.shape[2] for batch in self.pool) - self.pool_offset,
+                    "bytes": sum(batch.nbytes for key, batch in pool.items() if key not in assigned),
+                },
+                "seeded_batches": {
+                    "entries": len(self.seeded_batches),
+                    "bytes": sum(batch.corrections.nbytes for batch in self.seeded_batches.values()),
+                },
+            }
+
+    def pool_size(self) -> int:
+        """
+        Number of triplets generated but not assigned yet.
+        """
+        with self.lock:
+            return sum(batch.shape[2] for batch in self.pool) - self.pool_offset
+
+    def _fill_pool(self, count: int) -> None:
+        """
+        Generate `count` triplets batch by batch, and add them to the pool.
+        """
+        while count > 0:
+            batch = self.generate_triplets(min(count, self.batch_size))
+            count -= batch.shape[2]
+            with self.lock:
+                self.pool.append(batch)
+
+    def _evict(self) -> None:
+        """
+        Drop the triplets and the seeded batches assigned for more than `ttl` seconds. The lock
+        must be held.
+        """
+        deadline = time.monotonic() - self.ttl
+        for assignments in (self.dict_castor, self.seeded_batches):
+            while assignments:
+                key, assignment = next(iter(assignments.items()))
+                if assignment.assigned > deadline:
+                    break
+                del assignments[key]
+
+    def _next_triplet(self) -> Tuple[np.ndarray, int]:
+        """
+        Take the next triplet of the pool, generating a batch if it is empty. The lock must be held.
+        """
+        if not self.pool:
+            self.pool.append(self.generate_triplets(self.batch_size))
+
+        batch, col = self.pool[0], self.pool_offset
+        self.pool_offset += 1
+        if self.pool_offset == batch.shape[2]:
+            self.pool.popleft()
+            self.pool_offset = 0
+
+        return batch, col
+
+
+class _Assignment:
+    """
+    A triplet assigned to an operation, as a column of a batch, with the participants that
+    did not retrieve their shares yet.
+    """
+
+    __slots__ = ("batch", "col", "readers", "assigned")
+
+    def __init__(self, batch: np.ndarray, col: int, readers: Set[str]):
+        self.batch = batch
+        self.col = col
+        self.readers = set(readers)
+        self.assigned = time.monotonic()
+
+
+class _SeededBatch:
+    """
+    The nonce and the corrections of the seeded triplets of a list of operations, with the
+    participants that did not retrieve them yet.
+    """
+
+    __slots__ = ("nonce", "corrections", "readers", "assigned")
 
+    def __init__(self, nonce: bytes, corrections: np.ndarray, readers: Set[str]):
+        self.nonce = nonce
+        self.corrections = corrections
+        self.readers = set(readers)
+        self.assigned = time.monotonic()
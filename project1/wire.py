@@ -0,0 +1,71 @@
+r"""
+Compact binary wire format of the messages.
+
+Field elements are encoded as fixed-width 8-byte little-endian integers, after a 4-byte
+little-endian count:
+>>> pack_elements([1, 2])
+b'\x02\x00\x00\x00\x01\x00\x00\x00\x00\x00\x00\x00\x02\x00\x00\x00\x00\x00\x00\x00'
+
+A batch of messages is a sequence of frames, each prefixed by its 4-byte little-endian length.
+Batches are only sent in this format to clients asking for it with the BINARY_CONTENT_TYPE, JSON
+being used otherwise.
+"""
+
+import struct
+from typing import List, Sequence, Union
+
+import numpy as np
+
+
+BINARY_CONTENT_TYPE = "application/x-smc-binary"
+JSON_CONTENT_TYPE = "application/json"
+
+# Field elements are below 2^64, so they fit on 8 bytes
+ELEMENT_DTYPE = np.dtype("<u8")
+
+_LENGTH = struct.Struct("<I")
+
+
+def pack_elements(values: Union[Sequence[int], np.ndarray]) -> bytes:
+    """
+    Encode a vector of field elements.
+    """
+    elements = np.asarray(values, dtype=ELEMENT_DTYPE)
+    return _LENGTH.pack(len(elements)) + elements.tobytes()
+
+
+def unpack_elements(data: bytes) -> np.ndarray:
+    """
+    Decode a vector of field elements into a uint64 array.
+    """
+    (count,) = _LENGTH.unpack_from(data)
+    return np.frombuffer(data, dtype=ELEMENT_DTYPE, count=count, offset=_LENGTH.size).astype(np.uint64)
+
+
+def pack_frames(frames: Sequence[Union[bytes, str]]) -> bytes:
+    """
+    Encode a batch of messages, strings being encoded in UTF-8.
+    """
+    parts = []
+    for frame in frames:
+        if isinstance(frame, str):
+            frame = frame.encode()
+        parts.append(_LENGTH.pack(len(frame)))
+        parts.append(frame)
+    return b"".join(parts)
+
+
+def unpack_frames(data: bytes) -> List[bytes]:
+    """
+    Decode a batch of messages.
+    """
+    frames = []
+    offset = 0
+    while offset < len(data):
+        (length,) = _LENGTH.unpack_from(data, offset)
+        offset += _LENGTH.size
+        if offset + length > len(data):
+            raise ValueError("Truncated frame")
+        frames.append(bytes(data[offset:offset + length]))
+        offset += length
+    return frames
@@ -9,6 +9,7 @@ import argparse
 import copy
 import json
 import sys
+import time
 from pathlib import Path
 from typing import List, Optional, Tuple
 
@@ -102,6 +103,49 @@ def main(args: List[str]) -> None:
 
     parser_register.set_defaults(callback=client_register)
 
+    # Bulk register parser.
+    parser_register_batch = subparsers.add_parser(
+        "register-batch", help="Register many users to the server at once."
+    )
+    parser_register_batch.add_argument(
+        "-p",
+        "--pub",
+        help="Name of the file from which to read the public key.",
+        type=argparse.FileType("rb"),
+        default="key-client.pub"
+    )
+    parser_register_batch.add_argument(
+        "-i",
+        "--in",
+        dest="users",
+        help="Name of the JSON file from which to read the users, as a list of "
+        "{\"username\": ..., \"subscriptions\": [...]} objects.",
+        type=argparse.FileType("r"),
+        required=True
+    )
+    parser_register_batch.add_argument(
+        "-o",
+        "--out",
+        help="Name of the JSON file in which to write the attribute-based credentials, by user name.",
+        type=argparse.FileType("w"),
+        default="anon-creds.json"
+    )
+    parser_register_batch.add_argument(
+        "-b",
+        "--batch-size",
+        help="Number of registrations sent per request.",
+        type=int,
+        default=1000
+    )
+    parser_register_batch.add_argument(
+        "-t",
+        "--tor",
+        help="Use Tor to connect to the server.",
+        action="store_true"
+    )
+
+    parser_register_batch.set_defaults(callback=client_register_batch)
+
     # Parser for part 1 of the project 2
     parser_loc = subparsers.add_parser("loc", help="Part 1 of the project 2.")
     parser_loc.add_argument(
@@ -303,6 +347,76 @@ def client_register(args: argparse.Namespace) -> None:
         args.out.close()
 
 
+def client_register_batch(args: argparse.Namespace) -> None:
+    """Handle `register-batch` subcommand."""
+
+    try:
+        public_key = args.pub.read()
+        users = json.load(args.users)
+
+    finally:
+        args.pub.close()
+        args.users.close()
+
+    # Credentials issued so far, by username: they are written out even if a later chunk fails
+    credentials = {}
+    try:
+        host, proxy = get_conn_params(args.tor)
+
+        # Done in a proper way, we would use HTTPS instead of HTTP.
+        url = f"http://{host}/register-batch"
+        session = create_session(proxy)
+
+        client = Client()
+        start = time.perf_counter()
+
+        for offset in range(0, len(users), args.batch_size):
+            batch = users[offset:offset + args.batch_size]
+
+            registrations = []
+            states = []
+            for user in batch:
+                # Copy to prepare registration
+                subscriptions_client = copy.deepcopy(user["subscriptions"])
+                issuance_req, state = client.prepare_registration(
+                    public_key, user["username"], subscriptions_client
+                )
+                registrations.append({
+                    "username": user["username"],
+                    "subscriptions": user["subscriptions"],
+                    "issuance_req": issuance_req.decode("utf-8"),
+                })
+                states.append(state)
+
+            files = {"registrations": json.dumps(registrations)}
+            res = session.post(url=url, files=files)
+
+            if res.status_code != 200:
+                raise ClientHTTPError("The client failed to register the users to the server!")
+
+            for user, issuance_res, state in zip(batch, res.json()["responses"], states):
+                # The server did not sign an invalid request
+                if json.loads(issuance_res) is None:
+                    continue
+
+                credential = client.process_registration_response(
+                    public_key, issuance_res.encode("utf-8"), state
+                )
+                credentials[user["username"]] = credential.decode("utf-8")
+
+        elapsed = time.perf_counter() - start
+
+    finally:
+        json.dump(credentials, args.out)
+        args.out.close()
+
+    rate = len(credentials) / elapsed if elapsed > 0 else 0.0
+    print(
+        f"Registered {len(credentials)} of {len(users)} users in {elapsed:.3f} s "
+        f"({rate:.1f} credentials/s)."
+    )
+
+
 def client_loc(args: argparse.Namespace) -> None:
     """Handle `loc` subcommand."""
 
@@ -78,7 +78,7 @@ def generate_key(
 
     ##  Creation of the secret key
     x = p.random()
-    X1 = g1 ** x 
+    X1 = g1 ** x
     ys = [p.random() for _ in range(attributes_count)]
 
     secret_key = SecretKey(x, X1, ys)
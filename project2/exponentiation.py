@@ -0,0 +1,97 @@
+"""
+Fixed-base exponentiation of the generators of the public key.
+
+With every issuance request, the issuer raises the same generators (g1, Y1[i]) to fresh exponents:
+to verify the proof of knowledge of the request, and to sign the attributes it adds. A table of the
+powers of each generator is built once and cached, so that a product of powers like
+g1 ** t * Y1[0] ** a_0 * Y1[1] ** a_1 is only a product of table entries, without any squaring:
+>>> tables = [fixed_base(pk.g1, G1), fixed_base(pk.Y1[0], G1)]
+>>> multi_exp(tables, [t, a_0]) == pk.g1 ** t * pk.Y1[0] ** a_0
+True
+
+A table costs about forty plain exponentiations to build, and a single exponentiation from a table
+is not faster than petrelic's own, so the other bases are exponentiated directly.
+"""
+
+import collections
+import threading
+from typing import Any, List
+
+# Number of bits of the exponents handled by each row of a table. A table holds
+# 2 ** WINDOW entries per row, and an exponentiation takes one multiplication per row.
+WINDOW = 5
+
+# Number of tables kept, by base, besides the room reserved for the generators of the keys in use
+# (see reserve_tables), so that they are not rebuilt over and over again.
+TABLES_CACHE_SIZE = 128
+_capacity = TABLES_CACHE_SIZE
+
+_tables: "collections.OrderedDict[Any, FixedBaseTable]" = collections.OrderedDict()
+# The tables are shared by the threads signing batches of issuance requests
+_tables_lock = threading.Lock()
+
+
+class FixedBaseTable:
+    """Powers of a group element: row j holds base ** (d * 2 ** (WINDOW * j)) for every digit d.
+    """
+
+    def __init__(self, base: Any, group: Any, window: int = WINDOW):
+        self.base = base
+        self.group = group
+        self.order = int(group.order())
+        self.window = window
+
+        self.rows: List[List[Any]] = []
+        power = base  # base ** (2 ** (window * j))
+        for _ in range(-(-self.order.bit_length() // window)):
+            row = [None, power]
+            for _ in range(2, 2 ** window):
+                row.append(row[-1] * power)
+            self.rows.append(row)
+            power = row[-1] * power
+
+    def exp(self, exponent: Any) -> Any:
+        """ Raise the base to a Bn or int exponent """
+        return multi_exp([self], [exponent])
+
+
+def fixed_base(base: Any, group: Any) -> FixedBaseTable:
+    """ Table of a base of a group (G1 or G2), built the first time it is asked for """
+    key = (group, base.to_binary())
+    with _tables_lock:
+        table = _tables.get(key)
+        if table is None:
+            table = FixedBaseTable(base, group)
+            _tables[key] = table
+            if len(_tables) > _capacity:
+                _tables.popitem(last=False)
+        else:
+            _tables.move_to_end(key)
+        return table
+
+
+def reserve_tables(count: int) -> None:
+    """ Keep room in the cache for the tables of `count` more bases, e.g. the generators of a key """
+    global _capacity
+    with _tables_lock:
+        _capacity += count
+
+
+def multi_exp(tables: List[FixedBaseTable], exponents: List[Any]) -> Any:
+    """ Product of the bases of the tables (at least one, of a same group) raised to the exponents """
+    res = None
+    for table, exponent in zip(tables, exponents):
+        e = int(exponent) % table.order
+        mask = 2 ** table.window - 1
+        row = 0
+        while e:
+            digit = e & mask
+            if digit:
+                entry = table.rows[row][digit]
+                res = entry if res is None else res * entry
+            e >>= table.window
+            row += 1
+
+    if res is None:
+        return tables[0].group.neutral_element()
+    return res
@@ -1,16 +1,36 @@
-from typing import List
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
 
 from credential import SecretKey, PublicKey, IssueRequest, BlindSignature, generate_key, DisclosureProof, Attribute
-from petrelic.multiplicative.pairing import G1, G2, GT, Bn
+from exponentiation import fixed_base, multi_exp, reserve_tables
+from petrelic.multiplicative.pairing import G1, G2, GT, Bn, G1Element, G2Element, GTElement
 from zkp import KnowledgeProof
 
+# Number of sets of disclosed attributes whose verification key is kept
+VERIFICATION_KEYS_CACHE_SIZE = 1024
+
+# An issuance request with the attributes the issuer adds to it
+IssuanceRequest = Tuple[IssueRequest, List[Attribute]]
+
+# Number of threads signing a batch of issuance requests. RELIC is built without thread-local state,
+# and its arithmetic is not known to be safe to run from several threads at once, so the requests
+# are signed on the calling thread unless more workers are asked for. The random values are drawn
+# before any thread is started anyway, as RELIC's random generator is shared.
+ISSUANCE_WORKERS = 1
+
 
 class Issuer:
     """Correspond to the issuer/verifier in our scheme. It signs and verifies requests from the user.
+    An issuer is meant to be long-lived, as it keeps values derived from its public key across requests.
     """
 
     def __init__(self, sk, pk):
         self.sk, self.pk = sk, pk
+        # The tables of g1 and of every Y1[i] are used by every issuance
+        reserve_tables(len(pk.Y1) + 1)
+        # The same sets of subscriptions are disclosed over and over again
+        self.verification_key = functools.lru_cache(maxsize=VERIFICATION_KEYS_CACHE_SIZE)(verification_key)
 
     ## ISSUANCE PROTOCOL ##
     def sign_issue_request(
@@ -25,21 +45,84 @@ class Issuer:
         This corresponds to the "Issuer signing" step in the issuance protocol.
         """
         
-        # Random value used as an exponent
-        u = G1.order().random()
+        if not KnowledgeProof.verify_commitment(request, self.issuance_generators(pk, request)):
+            return None
+
+        return self.blind_sign(sk, pk, request, issuer_attributes)
+
+    def sign_issue_requests(
+            self,
+            sk: SecretKey,
+            pk: PublicKey,
+            requests: List[IssuanceRequest],
+            workers: int = ISSUANCE_WORKERS
+    ) -> List[Optional[BlindSignature]]:
+        """ Create the signatures of many issuance requests at once, None for the invalid requests
+
+        The proofs of the requests committing to the same number of secrets are verified together
+        (see KnowledgeProof.verify_commitments), and the valid requests are signed by `workers`
+        threads (see ISSUANCE_WORKERS). A malformed request is not signed, like an invalid one, without failing
+        the other requests.
+        """
+        valid = [False] * len(requests)
+        by_length = {}
+        for idx, (request, _) in enumerate(requests):
+            try:
+                by_length.setdefault(len(request.list_ss), []).append(idx)
+            except Exception:  # pylint: disable=broad-except
+                continue
+        for indices in by_length.values():
+            proofs = [requests[idx][0] for idx in indices]
+            public_generators = self.issuance_generators(pk, proofs[0])
+            for idx, is_valid in zip(indices, KnowledgeProof.verify_commitments(proofs, public_generators)):
+                valid[idx] = is_valid
 
-        # Generate the list of public generators, one per secret, to verify the commitment
+        # Random exponent of every signature, drawn from RELIC's generator on this thread
+        exponents = [G1.order().random() if is_valid else None for is_valid in valid]
+
+        def sign(idx: int) -> Optional[BlindSignature]:
+            if not valid[idx]:
+                return None
+            request, issuer_attributes = requests[idx]
+            try:
+                return self.blind_sign(sk, pk, request, issuer_attributes, exponents[idx])
+            except Exception:  # pylint: disable=broad-except
+                return None
+
+        if workers <= 1:
+            return [sign(idx) for idx in range(len(requests))]
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(sign, range(len(requests))))
+
+    @staticmethod
+    def issuance_generators(pk: PublicKey, request: IssueRequest) -> List[G1Element]:
+        """ Public generators of the proof of an issuance request, one per secret """
         public_generators = pk.Y1[:len(request.list_ss) - 1]
         public_generators += [pk.g1] # one more generator for _t_
+        return public_generators
 
-        if not KnowledgeProof.verify_commitment(request, public_generators):
-            return None
+    @staticmethod
+    def blind_sign(
+            sk: SecretKey,
+            pk: PublicKey,
+            request: IssueRequest,
+            issuer_attributes: List[Attribute],
+            u: Optional[Bn] = None
+    ) -> BlindSignature:
+        """ Sign an issuance request whose proof was verified, with the random exponent `u` if given """
+
+        # Random value used as an exponent
+        if u is None:
+            u = G1.order().random()
 
         # Create a signature corresponding to the user's request on disclosed attributes
-        prod = sk.X1 * request.commitment
         n_hidden_attr = len(pk.Y1) - len(issuer_attributes)
-        for i,a in enumerate(issuer_attributes):
-            prod *= pk.Y1[n_hidden_attr+i] ** Bn.from_binary(a)
+        prod = sk.X1 * request.commitment
+        if issuer_attributes:
+            prod = prod * multi_exp(
+                [fixed_base(g, G1) for g in pk.Y1[n_hidden_attr:]],
+                [Bn.from_binary(a) for a in issuer_attributes]
+            )
 
         s_prime = (pk.g1 ** u, prod ** u)
         return s_prime
@@ -58,11 +141,7 @@ class Issuer:
         """
 
         # recompute the commitment from the set of all subscriptions (stored in the disclosure proof)
-        com_prime = disclosure_proof.signature[1].pair(pk.g2)
-        for i, a in enumerate(disclosure_proof.disclosed_attributes):
-            com_prime /= disclosure_proof.signature[0].pair(pk.Y2[i + 1]) ** Bn.from_binary(a)
-            
-        com_prime /= disclosure_proof.signature[0].pair(pk.X2)
+        com_prime = self.recompute_commitment(pk, disclosure_proof)
 
         # compute the challenge over the queried types and the message to prevent tampering
         challenge = KnowledgeProof.get_challenge(None, revealed_attributes, com_prime, message)
@@ -71,3 +150,23 @@ class Issuer:
         is_signature_valid = com_prime.eq(disclosure_proof.commitment)
             
         return disclosure_proof.signature[0] != G1.neutral_element() and is_signature_valid
+
+    def recompute_commitment(self, pk: PublicKey, disclosure_proof: DisclosureProof) -> GTElement:
+        """ Commitment of a disclosure proof, recomputed from its signature and disclosed attributes
+
+        By bilinearity, the pairings of signature[0] with X2 and with every Y2[i + 1] ** a_i are a
+        single pairing with their product, which only depends on the disclosed attributes: it costs
+        two pairings whatever the number of subscriptions.
+        """
+        key = self.verification_key(pk, tuple(disclosure_proof.disclosed_attributes))
+        return disclosure_proof.signature[1].pair(pk.g2) / disclosure_proof.signature[0].pair(key)
+
+
+def verification_key(pk: PublicKey, disclosed_attributes: Tuple[Attribute, ...]) -> G2Element:
+    """ Product X2 * Y2[1] ** a_1 * ... * Y2[L] ** a_L of the public key, for the disclosed
+    attributes a_1, ..., a_L of a disclosure proof
+    """
+    key = pk.X2
+    for i, a in enumerate(disclosed_attributes):
+        key = key * pk.Y2[i + 1] ** Bn.from_binary(a)
+    return key
@@ -9,11 +9,13 @@ import argparse
 import json
 import random
 import sys
+import time
 from typing import Dict, List, Union
 
 from flask import Flask, jsonify, make_response, request
 from flask_sqlalchemy import SQLAlchemy
 
+from issuer import ISSUANCE_WORKERS
 from stroll import Server
 
 
@@ -67,6 +69,13 @@ def main(args: List[str]) -> None:
         default="key.sec",
         type=argparse.FileType("rb")
     )
+    parser_run.add_argument(
+        "-w",
+        "--workers",
+        help="Number of threads signing the requests of a bulk registration (experimental above 1).",
+        default=ISSUANCE_WORKERS,
+        type=int
+    )
 
     parser_run.set_defaults(callback=server_run)
 
@@ -108,6 +117,7 @@ def server_run(args: argparse.Namespace) -> None:
     global PUBLIC_KEY
     global SECRET_KEY
     global SERVER
+    global WORKERS
 
     try:
         PUBLIC_KEY = args.pub.read()
@@ -117,11 +127,15 @@ def server_run(args: argparse.Namespace) -> None:
         args.pub.close()
         args.sec.close()
 
-    SERVER = Server()
+    # The keys are parsed once, and reused by every request
+    SERVER = Server(SECRET_KEY, PUBLIC_KEY)
+    WORKERS = args.workers
 
     host = "0.0.0.0"
     port = 8080
 
+    # Requests are served one at a time: RELIC keeps no thread-local state, and its random
+    # generator is shared by every thread
     APP.run(host=host, port=port, debug=True, threaded=False, processes=1)
 
 
@@ -171,6 +185,7 @@ DB.init_app(APP)
 PUBLIC_KEY = None
 SECRET_KEY = None
 SERVER = None
+WORKERS = ISSUANCE_WORKERS
 
 
 @APP.route("/public-key", methods=["GET"])
@@ -198,6 +213,36 @@ def register():
     return server_res
 
 
+@APP.route("/register-batch", methods=["POST"])
+def register_batch():
+    """Handle bulk registrations, given as a list of registrations (username, subscriptions and
+    issuance request), and answered with the list of their responses."""
+    registrations_raw = request.files.get("registrations").read().decode("utf-8")
+    registrations = [
+        (
+            registration["issuance_req"].encode("utf-8"),
+            registration["username"],
+            registration["subscriptions"]
+        )
+        for registration in json.loads(registrations_raw)
+    ]
+
+    start = time.perf_counter()
+    registration_res = SERVER.process_registrations(
+        SECRET_KEY,
+        PUBLIC_KEY,
+        registrations,
+        WORKERS
+    )
+    elapsed = time.perf_counter() - start
+    APP.logger.info(
+        "Processed %d registrations in %.3f s (%.1f credentials/s)",
+        len(registrations), elapsed, len(registrations) / elapsed if elapsed > 0 else 0.0
+    )
+
+    return jsonify({"responses": [res.decode("utf-8") for res in registration_res]})
+
+
 def convert_loc_to_gridval(loc):
     """Placeholder function. Final function would convert the location to a grid value."""
     return int(loc)
@@ -2,12 +2,12 @@
 Classes that you need to complete.
 """
 
-from typing import Any, Dict, List, Union, Tuple
+from typing import Any, Dict, List, Optional, Union, Tuple
 from zkp import KnowledgeProof
 
 # Optional import
 from credential import generate_key
-from issuer import Issuer
+from issuer import ISSUANCE_WORKERS, Issuer
 from serialization import jsonpickle
 
 # Type aliases
@@ -17,16 +17,41 @@ State = User
 
 
 class Server:
-    """Server"""
+    """Server
 
-    def __init__(self):
+    The serialized keys given to the requests are only parsed the first time they are seen: the
+    issuer built from them is kept as the key context of the server, and reused by the following
+    requests with the same keys.
+    """
+
+    def __init__(self, server_sk: Optional[bytes] = None, server_pk: Optional[bytes] = None):
         """
-        Server constructor.
+        Server constructor. The keys, if given, are loaded right away rather than on the
+        first request.
         """
         ###############################################
         # TODO: Complete this function.
         ###############################################
         self.issuer = None
+        # Serialized keys the issuer was built from
+        self.server_sk = None
+        self.server_pk = None
+        if server_pk is not None:
+            self.load_keys(server_pk, server_sk)
+
+    def load_keys(self, server_pk: bytes, server_sk: Optional[bytes] = None) -> Issuer:
+        """ Get the issuer of the given serialized keys, parsing them only if they differ from the
+        keys already loaded. The secret key is kept when it is not given.
+        """
+        if self.issuer is None or server_pk != self.server_pk:
+            self.issuer = Issuer(None, jsonpickle.decode(server_pk.decode()))
+            self.server_pk, self.server_sk = server_pk, None
+
+        if server_sk is not None and server_sk != self.server_sk:
+            self.issuer.sk = jsonpickle.decode(server_sk.decode())
+            self.server_sk = server_sk
+
+        return self.issuer
 
     @staticmethod
     def generate_ca(
@@ -80,19 +105,57 @@ class Server:
         ###############################################
         # TODO: Complete this function.
         ###############################################
-        sk = jsonpickle.decode(server_sk.decode())
-        pk = jsonpickle.decode(server_pk.decode())
+        issuer = self.load_keys(server_pk, server_sk)
         request = jsonpickle.decode(issuance_request.decode())
 
-        self.issuer = Issuer(sk, pk)
         issuer_attributes = []
         for i in range(len(subscriptions)):
             issuer_attributes.append(subscriptions[i].encode())
 
-        blindSignature = self.issuer.sign_issue_request(self.issuer.sk, self.issuer.pk, request, issuer_attributes)
+        blindSignature = issuer.sign_issue_request(issuer.sk, issuer.pk, request, issuer_attributes)
         
         return jsonpickle.encode(blindSignature).encode()
 
+    def process_registrations(
+            self,
+            server_sk: bytes,
+            server_pk: bytes,
+            registrations: List[Tuple[bytes, str, List[str]]],
+            workers: int = ISSUANCE_WORKERS
+    ) -> List[bytes]:
+        """ Registers many new accounts on the server at once.
+
+        Args:
+            server_sk: the server's secret key (serialized)
+            server_pk: the server's public key (serialized)
+            registrations: (issuance request (serialized), username, subscriptions) of every account
+            workers: number of threads signing the requests
+
+        Return:
+            serialized response of every registration (see process_registration)
+        """
+        issuer = self.load_keys(server_pk, server_sk)
+
+        # Index and issuance request of every registration that can be decoded
+        batch = []
+        for idx, (issuance_request, _, subscriptions) in enumerate(registrations):
+            # A malformed registration only fails itself, not the whole batch
+            try:
+                request = jsonpickle.decode(issuance_request.decode())
+                issuer_attributes = [subscription.encode() for subscription in subscriptions]
+            except Exception:  # pylint: disable=broad-except
+                continue
+
+            if isinstance(request, KnowledgeProof):
+                batch.append((idx, (request, issuer_attributes)))
+
+        blind_signatures = [None] * len(registrations)
+        signed = issuer.sign_issue_requests(issuer.sk, issuer.pk, [request for _, request in batch], workers)
+        for (idx, _), blind_signature in zip(batch, signed):
+            blind_signatures[idx] = blind_signature
+
+        return [jsonpickle.encode(blind_signature).encode() for blind_signature in blind_signatures]
+
     def check_request_signature(
             self,
             server_pk: bytes,
@@ -114,7 +177,7 @@ class Server:
         ###############################################
         # TODO: Complete this function.
         ###############################################
-        pk = jsonpickle.decode(server_pk.decode())
+        issuer = self.load_keys(server_pk)
         s = jsonpickle.decode(signature.decode())
 
         ## Check that the queried types are part of the valid subscriptions
@@ -124,8 +187,7 @@ class Server:
                 return False
 
 
-        self.issuer = Issuer(None, pk)
-        return self.issuer.verify_disclosure_proof(pk, s, message, queried_types)
+        return issuer.verify_disclosure_proof(issuer.pk, s, message, queried_types)
 
 
 class Client:
@@ -6,6 +6,8 @@ import jsonpickle
 from credential import AnonymousCredential, BlindSignature, DisclosureProof, IssueRequest, PublicKey, SecretKey, generate_key
 from petrelic.multiplicative.pairing import G1, G1Element, G2, G2Element, GT
 
+import exponentiation
+from exponentiation import fixed_base, multi_exp
 from issuer import Issuer
 from user import User
 
@@ -51,6 +53,30 @@ def test_key_generation():
     assert isinstance(pk.g1, G1Element) and isinstance(pk.g2, G2Element)
     
     
+## Test that the exponentiations from the tables of fixed bases match the plain exponentiations
+def test_fixed_base_exponentiation():
+    g1, g2 = G1.generator(), G2.generator()
+    exponents = [Bn(0), Bn(1), Bn(31), Bn(32), G1.order() - 1, G1.order().random()]
+
+    for e in exponents:
+        assert fixed_base(g1, G1).exp(e) == g1 ** e
+        assert fixed_base(g2, G2).exp(e) == g2 ** e
+
+    bases = [g1 ** G1.order().random() for _ in range(3)]
+    assert multi_exp([fixed_base(b, G1) for b in bases], exponents[3:]) == \
+        bases[0] ** exponents[3] * bases[1] ** exponents[4] * bases[2] ** exponents[5]
+
+
+## Test that the issuers of several keys each keep room for the tables of their generators
+def test_issuers_reserve_tables():
+    capacity = exponentiation._capacity
+    for subscriptions in (["t1", "t2"], ["t1", "t2", "t3"]):
+        _, pk = generate_key(subscriptions)
+        Issuer(None, pk)
+
+    assert exponentiation._capacity == capacity + (2 + 1) + (3 + 1)
+
+
 ## Test the successful generation of a credential step by step, as well as a stroll request
 def test_successful_request():
     subscriptions = ["t1", "t2", "t3"]
@@ -124,6 +150,45 @@ def test_credential_should_be_different():
     assert credential_enc_1 != credential_enc_2 # credential was tampered, it should be None. 
 
 
+## The server verifies the stroll requests of many subscriptions, and keeps verifying them
+## once the verification key of their subscriptions is cached
+def test_successful_requests_with_many_subscriptions():
+    subscriptions = [f"t{i}" for i in range(20)]
+    username = "test"
+    message = b'30.00.00'
+    sk, pk = get_keys(subscriptions)
+    server, client = Server(sk, pk), Client()
+
+    issue_request_enc, user_state = client.prepare_registration(pk, username, subscriptions)
+    blind_signature_enc = server.process_registration(sk, pk, issue_request_enc, username, subscriptions)
+    credential_enc = client.process_registration_response(pk, blind_signature_enc, user_state)
+
+    for queried_types in [["t1"], ["t5", "t19"], ["t1"]]:
+        stroll_request_enc = client.sign_request(pk, credential_enc, message, queried_types)
+        assert server.check_request_signature(pk, message, queried_types, stroll_request_enc)
+
+
+def test_successful_batch_registration():
+    subscriptions = ["t1", "t2", "t3"]
+    sk, pk = get_keys(subscriptions)
+    server, client = Server(sk, pk), Client()
+
+    registrations, states = [], []
+    for i in range(5):
+        username = f"user{i}"
+        issue_request_enc, user_state = client.prepare_registration(pk, username, subscriptions)
+        registrations.append((issue_request_enc, username, subscriptions))
+        states.append(user_state)
+
+    blind_signatures_enc = server.process_registrations(sk, pk, registrations, workers=2)
+    assert len(blind_signatures_enc) == len(registrations)
+
+    for blind_signature_enc, user_state in zip(blind_signatures_enc, states):
+        credential_enc = client.process_registration_response(pk, blind_signature_enc, user_state)
+        credential: AnonymousCredential = decode_data(credential_enc)
+        assert credential is not None
+
+
 ### =============
 ### FAILING CASES 
 ### =============
@@ -229,6 +294,51 @@ def test_message_tampering():
     assert not server.check_request_signature(pk, message, tampered_message, stroll_request_enc)
 
 
+## An invalid issuance request in a bulk registration should not be signed, without failing the
+## valid requests of the registration
+def test_batch_registration_with_tampered_request():
+    subscriptions = ["t1", "t2", "t3"]
+    sk, pk = get_keys(subscriptions)
+    server, client = Server(sk, pk), Client()
+
+    registrations = []
+    for i in range(4):
+        issue_request_enc, _ = client.prepare_registration(pk, f"user{i}", subscriptions)
+        registrations.append((issue_request_enc, f"user{i}", subscriptions))
+
+    # Change the challenge of a proof, and send an undecodable request
+    issue_request: IssueRequest = decode_data(registrations[1][0])
+    issue_request.challenge += 1
+    registrations[1] = (jsonpickle.encode(issue_request).encode(), "user1", subscriptions)
+    registrations.append((b"not a request", "user4", subscriptions))
+
+    blind_signatures = [decode_data(res) for res in server.process_registrations(sk, pk, registrations)]
+    assert [blind_signature is not None for blind_signature in blind_signatures] == [True, False, True, True, False]
+
+
+## Malformed issuance requests that decode should only fail their own registration
+def test_batch_registration_with_malformed_requests():
+    subscriptions = ["t1", "t2", "t3"]
+    sk, pk = get_keys(subscriptions)
+    server, client = Server(sk, pk), Client()
+
+    registrations = []
+    for i in range(4):
+        issue_request_enc, _ = client.prepare_registration(pk, f"user{i}", subscriptions)
+        registrations.append((issue_request_enc, f"user{i}", subscriptions))
+
+    # Drop the responses of a proof, and the commitment of another one
+    issue_request: IssueRequest = decode_data(registrations[1][0])
+    issue_request.list_ss = None
+    registrations[1] = (jsonpickle.encode(issue_request).encode(), "user1", subscriptions)
+    issue_request = decode_data(registrations[2][0])
+    issue_request.commitment = None
+    registrations[2] = (jsonpickle.encode(issue_request).encode(), "user2", subscriptions)
+
+    blind_signatures = [decode_data(res) for res in server.process_registrations(sk, pk, registrations)]
+    assert [blind_signature is not None for blind_signature in blind_signatures] == [True, False, False, True]
+
+
 ## Stroll requests should only work on valid POI types, e.g. the ones that are subscribed too
 ## during the registration phase and the issuance of the credential. If an invalid POI type is
 ## queried, the request should fail. 
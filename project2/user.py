@@ -34,11 +34,6 @@ class User:
         """
         self.t = G1.order().random()
 
-        # Compute issue request commitment
-        commitment = pk.g1 ** self.t
-        for i,a in enumerate(user_attributes):
-            commitment *= pk.Y1[i] ** Bn.from_binary(a)
-
         # Generate the list of secrets and parse them to big numbers
         list_secrets = [Bn.from_binary(secret) for secret in user_attributes]
         list_secrets += [self.t] # t is a random value considered a secret too
@@ -47,6 +42,11 @@ class User:
         list_generators = [pk.Y1[idx] for idx in list(range(len(user_attributes)))]
         list_generators += [pk.g1] # generator for t
 
+        # Compute issue request commitment g1 ** t * Y1[0] ** a_0 * ...
+        commitment = list_generators[0] ** list_secrets[0]
+        for g, secret in zip(list_generators[1:], list_secrets[1:]):
+            commitment *= g ** secret
+
         knowledge_proof = KnowledgeProof.create_commitment(
             list_secrets, 
             list_generators, 
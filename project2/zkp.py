@@ -5,6 +5,8 @@ from petrelic.multiplicative.pairing import G1, G2, GT
 import serialization
 import jsonpickle
 
+from exponentiation import fixed_base, multi_exp
+
 
 
 class KnowledgeProof:
@@ -64,17 +66,47 @@ class KnowledgeProof:
 
 
     @staticmethod
-    def verify_commitment(knowledge_proof: 'KnowledgeProof', public_generators: List[Any], message=b""):
+    def verify_commitment(knowledge_proof: 'KnowledgeProof', public_generators: List[Any], message=b"", group=G1):
         """Verify a commitment for a proof of knowledge using pedersen's scheme. 
         Called by the verifier.
         """
+        return KnowledgeProof.verify_commitments([knowledge_proof], public_generators, message, group)[0]
+
+
+    @staticmethod
+    def verify_commitments(knowledge_proofs: List['KnowledgeProof'], public_generators: List[Any], message=b"", group=G1) -> List[bool]:
+        """Verify several proofs of knowledge over the same public generators, returning whether
+        each of them is valid. Called by the verifier.
+
+        The challenge of every proof is a hash of its own R, so every R has to be recomputed: the
+        tables of the generators are shared by all the proofs, each R only taking one exponentiation
+        of its commitment besides the products of table entries. A malformed proof is not valid,
+        without failing the other proofs.
+        """
+        tables = [fixed_base(g, group) for g in public_generators]
+
+        results = []
+        for knowledge_proof in knowledge_proofs:
+            try:
+                results.append(KnowledgeProof._verify_with_tables(knowledge_proof, public_generators, tables, message))
+            except Exception:  # pylint: disable=broad-except
+                results.append(False)
+
+        return results
+
+
+    @staticmethod
+    def _verify_with_tables(knowledge_proof: 'KnowledgeProof', public_generators: List[Any], tables: List[Any], message: bytes) -> bool:
+        """Verify a proof of knowledge from the tables of its public generators."""
+
+        # A proof over other generators than the expected ones is not valid
+        if len(knowledge_proof.list_ss) != len(public_generators):
+            return False
 
         # Reconstruct the challenge from the given data and check if it is the same
         # as the one given by the prover. 
         R = knowledge_proof.commitment ** knowledge_proof.challenge
-        for i, s in enumerate(knowledge_proof.list_ss):
-            R *= public_generators[i] ** s
+        R = R * multi_exp(tables, knowledge_proof.list_ss)
 
         c_prime = KnowledgeProof.get_challenge(R, public_generators, knowledge_proof.commitment, message)
-
-        return c_prime == knowledge_proof.challenge
\ No newline at end of file
+        return c_prime == knowledge_proof.challenge